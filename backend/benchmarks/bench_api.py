@@ -0,0 +1,34 @@
+import pytest
+from fastapi.testclient import TestClient
+from benchmarks.conftest import build_request
+
+# Request latency through the FastAPI stack (validation, generation, serialization), without auth/DB lookups.
+
+@pytest.fixture(scope="module")
+def client():
+    from main import app
+    from auth import get_current_user
+
+    app.dependency_overrides[get_current_user] = lambda: {"username": "benchmark"}
+    with TestClient(app) as c:
+        yield c
+    app.dependency_overrides.pop(get_current_user, None)
+
+def payload(rows_count, output_format):
+    request = build_request([{"id": "t1", "name": "users", "rows_count": rows_count, "fields": [
+        {"name": "id", "type": "integer", "params": {"min": 1, "max": 10 ** 9}, "is_unique": True},
+        {"name": "email", "type": "faker", "params": {"method": "email"}},
+        {"name": "plan", "type": "distribution", "params": {"options": ["free", "pro"], "weights": [9, 1]}}
+    ]}], output_format=output_format)
+    return request.model_dump()
+
+def test_health_latency(benchmark, client):
+    response = benchmark(client.get, "/")
+    assert response.status_code == 200
+
+@pytest.mark.parametrize("output_format", ["json", "csv", "sql"])
+@pytest.mark.parametrize("rows_count", [10, 1000])
+def test_generate_sync_latency(benchmark, client, rows_count, output_format):
+    body = payload(rows_count, output_format)
+    response = benchmark(client.post, "/generate", json=body)
+    assert response.status_code == 200
@@ -0,0 +1,28 @@
+import json
+import pytest
+from benchmarks.conftest import EXPORT_ROWS, build_rows
+from exporters import DataExporter
+from columnar import ColumnarTable, encode_tables
+
+# Export and job-store serialization throughput. Sizes come from BENCH_EXPORT_ROWS (default 10k, 100k, 1M).
+
+@pytest.fixture(scope="module", params=EXPORT_ROWS, ids=lambda n: f"{n}_rows")
+def tables_data(request):
+    return {"users": ColumnarTable.from_rows(build_rows(request.param))}
+
+def run(benchmark, func, tables_data):
+    rows = len(tables_data["users"])
+    benchmark.extra_info["rows"] = rows
+    # Large exports take seconds per call; a fixed number of rounds keeps the suite bounded.
+    benchmark.pedantic(func, args=(tables_data,), rounds=3 if rows <= 100000 else 1, iterations=1)
+    if benchmark.stats:  # None under --benchmark-disable
+        benchmark.extra_info["rows_per_sec"] = round(rows / benchmark.stats.stats.median, 1)
+
+def test_export_csv_zip(benchmark, tables_data):
+    run(benchmark, DataExporter.to_csv_zip, tables_data)
+
+def test_export_sql(benchmark, tables_data):
+    run(benchmark, DataExporter.to_sql, tables_data)
+
+def test_serialize_job_result(benchmark, tables_data):
+    run(benchmark, lambda data: json.dumps(encode_tables(data)), tables_data)
@@ -0,0 +1,61 @@
+import random
+import pytest
+from faker import Faker
+from columnar import ColumnarTable
+
+# Micro-benchmarks: one call of each DataEngine._generate_* method per iteration.
+
+@pytest.fixture(scope="module")
+def faker_instance():
+    return Faker("en_US")
+
+@pytest.fixture(scope="module")
+def fk_data():
+    return {"t_users": ColumnarTable.from_rows([{"id": i, "name": f"user{i}"} for i in range(10000)])}
+
+def test_faker_value(benchmark, data_engine, faker_instance):
+    benchmark(data_engine._generate_faker_value, {"method": "name"}, faker_instance)
+
+def test_timestamp_value(benchmark, data_engine, faker_instance):
+    benchmark(data_engine._generate_timestamp_value, {"min_date": "-1y", "max_date": "now"}, faker_instance)
+
+def test_integer_value(benchmark, data_engine):
+    benchmark(data_engine._generate_integer_or_float_value, {"min": 0, "max": 1000})
+
+def test_float_value(benchmark, data_engine):
+    benchmark(data_engine._generate_integer_or_float_value, {"min": 0.0, "max": 99.99})
+
+def test_boolean_value(benchmark, data_engine):
+    benchmark(data_engine._generate_boolean_value, {"probability": 30})
+
+def test_distribution_value(benchmark, data_engine):
+    benchmark(data_engine._generate_distribution_value, {"options": ["basic", "pro", "enterprise"], "weights": [70, 25, 5]})
+
+def test_regex_value(benchmark, data_engine):
+    benchmark(data_engine._generate_regex_value, {"pattern": r"[A-Z]{3}-\d{3}"})
+
+def test_regex_value_unique_stream(benchmark):
+    from regex_sampler import compile_regex
+
+    stream = compile_regex(r"[A-Z]{3}-\d{3}").unique_stream(random.Random(0))
+    benchmark(stream.next)
+
+def test_template_value(benchmark, data_engine):
+    context = {"first_name": "Anna", "last_name": "Nowak"}
+    benchmark(data_engine._generate_template_value, {"template": "{{ first_name|first_letter }}.{{ last_name|slugify }}@example.com"}, context)
+
+def test_foreign_key_value(benchmark, data_engine, fk_data):
+    benchmark(data_engine._generate_foreign_key_value, {"table_id": "t_users", "column_name": "id"}, fk_data)
+
+def test_foreign_key_value_unique(benchmark, data_engine, fk_data):
+    # Worst case for unique FKs: the avoid set filters the whole parent table on every call.
+    avoid = set(random.sample(range(10000), 5000))
+    benchmark(data_engine._generate_foreign_key_value, {"table_id": "t_users", "column_name": "id"}, fk_data, avoid)
+
+def test_llm_value_stub(benchmark, data_engine):
+    import asyncio
+
+    loop = asyncio.new_event_loop()
+    params = {"provider": "stub", "prompt_template": "Company slogan for {name}"}
+    benchmark(lambda: loop.run_until_complete(data_engine._generate_llm_value(params, {"name": "Acme"})))
+    loop.close()
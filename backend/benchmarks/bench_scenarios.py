@@ -0,0 +1,66 @@
+import asyncio
+import pytest
+from benchmarks.conftest import SCENARIO_ROWS, build_request
+from llm_providers import register_provider
+
+# End-to-end DataEngine.generate scenarios. Row counts scale with BENCH_SCENARIO_ROWS.
+
+def wide_table():
+    fields = []
+    for i in range(10):
+        fields.append({"name": f"name_{i}", "type": "faker", "params": {"method": "name"}})
+        fields.append({"name": f"amount_{i}", "type": "integer", "params": {"min": 0, "max": 10000}})
+        fields.append({"name": f"flag_{i}", "type": "boolean", "params": {"probability": 50}})
+        fields.append({"name": f"tier_{i}", "type": "distribution", "params": {"options": ["a", "b", "c"], "weights": [5, 3, 2]}})
+    return build_request([{"id": "t1", "name": "wide", "rows_count": SCENARIO_ROWS // 4, "fields": fields}])
+
+def deep_fk_chain(depth=6):
+    tables = []
+    for level in range(depth):
+        fields = [{"name": "id", "type": "integer", "params": {"min": 1, "max": 10 ** 9}, "is_unique": True}]
+        if level: fields.append({"name": "parent_id", "type": "foreign_key", "params": {"table_id": f"t{level - 1}", "column_name": "id"}})
+        tables.append({"id": f"t{level}", "name": f"level_{level}", "rows_count": SCENARIO_ROWS // depth, "fields": fields})
+    return build_request(tables)
+
+def unique_heavy():
+    return build_request([
+        {"id": "t1", "name": "accounts", "rows_count": SCENARIO_ROWS, "fields": [
+            {"name": "id", "type": "integer", "params": {"min": 1, "max": SCENARIO_ROWS * 2}, "is_unique": True},
+            {"name": "code", "type": "regex", "params": {"pattern": r"[A-Z]{3}-\d{3}"}, "is_unique": True},
+            {"name": "email", "type": "faker", "params": {"method": "email"}, "is_unique": True}
+        ]},
+        {"id": "t2", "name": "profiles", "rows_count": SCENARIO_ROWS // 2, "fields": [
+            {"name": "account_id", "type": "foreign_key", "params": {"table_id": "t1", "column_name": "id"}, "is_unique": True}
+        ]}
+    ])
+
+def template_heavy():
+    return build_request([{"id": "t1", "name": "people", "rows_count": SCENARIO_ROWS, "fields": [
+        {"name": "first_name", "type": "faker", "params": {"method": "first_name"}},
+        {"name": "last_name", "type": "faker", "params": {"method": "last_name"}},
+        {"name": "login", "type": "template", "params": {"template": "{{ first_name|first_letter }}{{ last_name|slugify('') }}"}},
+        {"name": "email", "type": "template", "params": {"template": "{{ first_name|slugify }}.{{ last_name|slugify }}@example.com"}},
+        {"name": "display", "type": "template", "params": {"template": "{{ last_name|upper }}, {{ first_name }}"}}
+    ]}])
+
+def llm_stub():
+    register_provider("bench-stub", kind="stub", default_model="stub", options={"latency_ms": 1}, limits={"max_concurrency": 64})
+    return build_request([{"id": "t1", "name": "products", "rows_count": max(1, SCENARIO_ROWS // 10), "fields": [
+        {"name": "name", "type": "faker", "params": {"method": "catch_phrase"}},
+        {"name": "description", "type": "llm", "params": {"provider": "bench-stub", "prompt_template": "Describe {name}"}},
+        {"name": "tagline", "type": "llm", "params": {"provider": "bench-stub", "prompt_template": "Tagline for {name}"}, "is_unique": True}
+    ]}])
+
+SCENARIOS = {"wide_table": wide_table, "deep_fk_chain": deep_fk_chain, "unique_heavy": unique_heavy, "template_heavy": template_heavy, "llm_stub": llm_stub}
+
+@pytest.mark.parametrize("scenario", list(SCENARIOS))
+def test_generate_scenario(benchmark, data_engine, scenario):
+    request = SCENARIOS[scenario]()
+    rows = sum(t.rows_count for t in request.tables)
+    benchmark.extra_info["rows"] = rows
+
+    result = benchmark.pedantic(lambda: asyncio.run(data_engine.generate(request)), rounds=3, warmup_rounds=1)
+
+    assert sum(len(r) for r in result.values()) == rows
+    if benchmark.stats:  # None under --benchmark-disable
+        benchmark.extra_info["rows_per_sec"] = round(rows / benchmark.stats.stats.median, 1)
@@ -0,0 +1,63 @@
+"""
+Regression report between two pytest-benchmark JSON files.
+
+    pytest benchmarks -o python_files="bench_*.py" --benchmark-json=baseline.json   # on main
+    pytest benchmarks -o python_files="bench_*.py" --benchmark-json=current.json    # on the branch
+    python -m benchmarks.compare baseline.json current.json --threshold 10
+
+Prints a markdown table of median times and exits with 1 if any benchmark got slower than the threshold (percent).
+"""
+import argparse
+import json
+import sys
+from typing import Dict, List, Tuple
+
+def load_medians(path: str) -> Dict[str, Dict]:
+    with open(path) as f:
+        report = json.load(f)
+    return {b["fullname"]: {"median": b["stats"]["median"], "extra_info": b.get("extra_info", {})} for b in report["benchmarks"]}
+
+def format_seconds(value: float) -> str:
+    if value >= 1: return f"{value:.3f} s"
+    if value >= 1e-3: return f"{value * 1e3:.3f} ms"
+    return f"{value * 1e6:.2f} us"
+
+def compare(baseline: Dict[str, Dict], current: Dict[str, Dict], threshold: float) -> Tuple[List[str], List[str]]:
+    lines = ["| Benchmark | Baseline | Current | Change | Rows/s |", "|---|---:|---:|---:|---:|"]
+    regressions = []
+    for name in sorted(set(baseline) | set(current)):
+        if name not in current:
+            lines.append(f"| {name} | {format_seconds(baseline[name]['median'])} | removed | | |")
+            continue
+        rows_per_sec = current[name]["extra_info"].get("rows_per_sec", "")
+        if name not in baseline:
+            lines.append(f"| {name} | new | {format_seconds(current[name]['median'])} | | {rows_per_sec} |")
+            continue
+        before, after = baseline[name]["median"], current[name]["median"]
+        change = (after - before) / before * 100 if before else 0.0
+        marker = ""
+        if change > threshold:
+            marker = " :red_circle:"
+            regressions.append(name)
+        elif change < -threshold:
+            marker = " :green_circle:"
+        lines.append(f"| {name} | {format_seconds(before)} | {format_seconds(after)} | {change:+.1f}%{marker} | {rows_per_sec} |")
+    return lines, regressions
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two pytest-benchmark JSON reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed slowdown of the median, in percent")
+    args = parser.parse_args(argv)
+
+    lines, regressions = compare(load_medians(args.baseline), load_medians(args.current), args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0f}%:")
+        for name in regressions: print(f"- {name}")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
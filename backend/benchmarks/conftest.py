@@ -0,0 +1,27 @@
+import os
+
+# Benchmarks never talk to a real provider or the project database.
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+
+import pytest
+from models import GeneratorRequest
+
+def env_sizes(name, default):
+    return [int(x) for x in os.getenv(name, default).split(",") if x.strip()]
+
+SCENARIO_ROWS = int(os.getenv("BENCH_SCENARIO_ROWS", "2000"))
+EXPORT_ROWS = env_sizes("BENCH_EXPORT_ROWS", "10000,100000,1000000")
+
+def build_request(tables, job_name="Benchmark", output_format="json"):
+    return GeneratorRequest(**{"config": {"job_name": job_name, "output_format": output_format, "locale": "en_US"}, "tables": tables})
+
+def build_rows(rows_count):
+    return [
+        {"id": i, "email": f"user{i}@example.com", "name": f"User O'Neil {i}", "score": i * 0.5, "active": i % 2 == 0, "created_at": "2024-01-01 12:00:00"}
+        for i in range(rows_count)
+    ]
+
+@pytest.fixture(scope="session")
+def data_engine():
+    from engine import DataEngine
+    return DataEngine()
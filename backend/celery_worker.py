@@ -1,7 +1,21 @@
 import os
+import glob
 from celery import Celery
+from kombu import Queue
+from celery.signals import worker_init, worker_ready, worker_process_init
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+WORKER_METRICS_PORT = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+if PROMETHEUS_MULTIPROC_DIR: os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+
+# Jobs are routed by workload class (see scheduling.py): LLM-bound jobs mostly wait on the network and run on a
+# threads pool with high concurrency, CPU-bound jobs on a prefork pool. "celery" is the pre-routing default queue.
+LLM_QUEUE = os.getenv("CELERY_LLM_QUEUE", "generate_llm")
+CPU_QUEUE = os.getenv("CELERY_CPU_QUEUE", "generate_cpu")
+# Redis broker priorities: 0 is consumed first; each level is a separate list named queue + PRIORITY_SEP + level.
+PRIORITY_LEVELS = 10
+PRIORITY_SEP = "\x06\x16"
 
 celery_app = Celery(
     "datasynth_worker",
@@ -15,5 +29,51 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-    imports=['tasks']
-)
\ No newline at end of file
+    imports=['tasks'],
+    # Unacked tasks are redelivered when a worker dies; generate_dataset_task resumes from its checkpoint.
+    task_acks_late=True,
+    task_reject_on_worker_lost=True,
+    worker_prefetch_multiplier=1,
+    task_queues=(Queue(LLM_QUEUE), Queue(CPU_QUEUE), Queue("celery")),
+    task_default_queue=CPU_QUEUE,
+    task_default_priority=5,
+    broker_transport_options={
+        "visibility_timeout": int(os.getenv("CELERY_VISIBILITY_TIMEOUT", "3600")),
+        "priority_steps": list(range(PRIORITY_LEVELS)),
+        "sep": PRIORITY_SEP,
+        "queue_order_strategy": "priority",
+    }
+)
+
+# Prometheus exporter for the worker. With PROMETHEUS_MULTIPROC_DIR set, the main process serves metrics aggregated
+# from all pool children; otherwise the (single) prefork child serves its own.
+def _start_metrics_server():
+    if not WORKER_METRICS_PORT: return
+    from prometheus_client import start_http_server
+    from metrics import metrics_registry
+    try: start_http_server(WORKER_METRICS_PORT, registry=metrics_registry())
+    except OSError as e: print(f"Warning: worker metrics server not started: {e}")
+
+@worker_init.connect
+def reset_multiprocess_metrics(**kwargs):
+    if not PROMETHEUS_MULTIPROC_DIR: return
+    for path in glob.glob(os.path.join(PROMETHEUS_MULTIPROC_DIR, "*.db")): os.remove(path)
+
+@worker_ready.connect
+def start_worker_metrics(**kwargs):
+    if PROMETHEUS_MULTIPROC_DIR: _start_metrics_server()
+
+@worker_process_init.connect
+def start_child_metrics(**kwargs):
+    if not PROMETHEUS_MULTIPROC_DIR: _start_metrics_server()
+
+# Build the engine and Faker locales before the pool forks, so every child starts warm.
+@worker_init.connect
+def warm_runtime(**kwargs):
+    from runtime import runtime
+    runtime.warm_up()
+
+@worker_process_init.connect
+def reset_runtime(**kwargs):
+    from runtime import runtime
+    runtime.reset_after_fork()
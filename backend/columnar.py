@@ -0,0 +1,164 @@
+import array
+from collections.abc import Mapping, Sequence
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+# Columns whose distinct values make up at most this share of the rows are dictionary-encoded.
+DICTIONARY_MAX_RATIO = 0.5
+# Dictionary encoding only for columns of one (non-None) type: 1, 1.0 and True are equal dict keys.
+DICTIONARY_TYPES = (str, bool, int)
+
+def _code_typecode(size: int) -> str:
+    if size <= 0xFF: return "B"
+    if size <= 0xFFFF: return "H"
+    return "I"
+
+class DictionaryColumn(Sequence):
+    """Low-cardinality column: each distinct value is stored once, rows hold 1-4 byte codes into it."""
+    __slots__ = ("values", "codes")
+
+    def __init__(self, values: List[Any], codes: Iterable[int]):
+        self.values = values
+        self.codes = array.array(_code_typecode(len(values)), codes)
+
+    @classmethod
+    def encode(cls, column: List[Any], distinct: Dict[Any, Any]) -> "DictionaryColumn":
+        values = list(distinct)
+        index = {value: code for code, value in enumerate(values)}
+        return cls(values, map(index.__getitem__, column))
+
+    def __len__(self): return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice): return [self.values[code] for code in self.codes[index]]
+        return self.values[self.codes[index]]
+
+    def __iter__(self) -> Iterator[Any]: return map(self.values.__getitem__, self.codes)
+
+def compact_column(column: List[Any]) -> Sequence:
+    """Smallest faithful form of a finished column: a typed array, a dictionary encoding or the list itself."""
+    if not column: return column
+    kinds = set(map(type, column))
+    if kinds == {int}:
+        try: return array.array("q", column)
+        except OverflowError: return column
+    if kinds == {float}: return array.array("d", column)
+    kinds.discard(type(None))
+    if len(kinds) != 1 or not issubclass(kinds.pop(), DICTIONARY_TYPES): return column
+    distinct = dict.fromkeys(column)
+    if len(distinct) > len(column) * DICTIONARY_MAX_RATIO: return column
+    return DictionaryColumn.encode(column, distinct)
+
+class RowView(Mapping):
+    """Read-only view of one row; behaves like the row dict without materialising it."""
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: "ColumnarTable", index: int):
+        self._table = table
+        self._index = index
+
+    def __getitem__(self, key): return self._table._data[key][self._index]
+    def __iter__(self): return iter(self._table.columns)
+    def __len__(self): return len(self._table.columns)
+    def __repr__(self): return repr(dict(self))
+
+class ColumnarTable(Sequence):
+    """
+    Generated rows stored column by column. Rows are appended to plain lists while a table is being generated; seal()
+    compacts every column once it is complete. Indexing returns RowView mappings, so code written against
+    List[Dict[str, Any]] keeps working without copying rows.
+    """
+    def __init__(self, columns: List[str], data: Optional[Dict[str, Sequence]] = None, length: int = 0):
+        self.columns = list(dict.fromkeys(columns))
+        self._data = data if data is not None else {name: [] for name in self.columns}
+        self._length = length
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "ColumnarTable":
+        columns = list(dict.fromkeys(key for row in rows for key in row))
+        table = cls(columns, {name: [row.get(name) for row in rows] for name in columns}, len(rows))
+        return table.seal()
+
+    def append(self, row: Dict[str, Any]):
+        for name in self.columns: self._data[name].append(row.get(name))
+        self._length += 1
+
+    def seal(self) -> "ColumnarTable":
+        self._data = {name: compact_column(column) if isinstance(column, list) else column for name, column in self._data.items()}
+        return self
+
+    def __len__(self): return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice): return [RowView(self, i) for i in range(*index.indices(self._length))]
+        if index < 0: index += self._length
+        if not 0 <= index < self._length: raise IndexError("row index out of range")
+        return RowView(self, index)
+
+    def __eq__(self, other):
+        if isinstance(other, ColumnarTable): return self.columns == other.columns and self.to_columns() == other.to_columns()
+        if isinstance(other, list): return self.to_rows() == other
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self): return f"ColumnarTable(columns={self.columns}, rows={self._length})"
+
+    def column(self, name: str) -> Optional[Sequence]:
+        return self._data.get(name)
+
+    def iter_tuples(self, start: int = 0, stop: Optional[int] = None) -> Iterator[tuple]:
+        stop = self._length if stop is None else min(stop, self._length)
+        if not self.columns: return iter([()] * max(0, stop - start))
+        if start == 0 and stop == self._length: return zip(*(self._data[name] for name in self.columns))
+        return zip(*(self._data[name][start:stop] for name in self.columns))
+
+    def to_rows(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        columns = self.columns
+        return [dict(zip(columns, values)) for values in self.iter_tuples(start, stop)]
+
+    def to_columns(self) -> Dict[str, list]:
+        return {name: list(self._data[name]) for name in self.columns}
+
+    def to_json_dict(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, Any]:
+        # Dictionary columns keep their encoding; typed arrays become plain JSON lists.
+        stop = self._length if stop is None else min(stop, self._length)
+        data = {}
+        for name in self.columns:
+            column = self._data[name]
+            if isinstance(column, DictionaryColumn) and start == 0 and stop == self._length:
+                data[name] = {"dictionary": column.values, "codes": column.codes.tolist()}
+            else:
+                data[name] = list(column[start:stop])
+        return {"columns": self.columns, "length": max(0, stop - start), "data": data}
+
+    @classmethod
+    def from_json_dict(cls, payload: Dict[str, Any], seal: bool = True) -> "ColumnarTable":
+        data = {}
+        for name in payload["columns"]:
+            column = payload["data"][name]
+            if isinstance(column, dict): column = DictionaryColumn(column["dictionary"], column["codes"]) if seal else [column["dictionary"][code] for code in column["codes"]]
+            data[name] = column
+        table = cls(payload["columns"], data, payload["length"])
+        return table.seal() if seal else table
+
+    @classmethod
+    def from_chunks(cls, chunks: List[Dict[str, Any]]) -> Optional["ColumnarTable"]:
+        """Joins checkpoint chunks (to_json_dict of consecutive row ranges) into a table that can still be appended to."""
+        table = None
+        for chunk in chunks:
+            part = cls.from_json_dict(chunk, seal=False)
+            if table is None: table = part; continue
+            for name in table.columns: table._data[name].extend(part._data.get(name) or [None] * len(part))
+            table._length += len(part)
+        return table
+
+def as_table(rows: Any) -> ColumnarTable:
+    """ColumnarTable for either a table or a plain list of row dicts (results stored before the columnar format)."""
+    if isinstance(rows, ColumnarTable): return rows
+    return ColumnarTable.from_rows(rows or [])
+
+def encode_tables(tables: Dict[str, Any]) -> Dict[str, Any]:
+    return {name: as_table(rows).to_json_dict() for name, rows in tables.items()}
+
+def decode_tables(payload: Dict[str, Any]) -> Dict[str, ColumnarTable]:
+    return {name: ColumnarTable.from_json_dict(table) if isinstance(table, dict) else as_table(table) for name, table in payload.items()}
@@ -1,6 +1,6 @@
 from sqlalchemy import create_engine, text
-import pandas as pd
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Union
+from columnar import ColumnarTable, as_table
 
 class DatabaseConnector:
     @staticmethod
@@ -14,15 +14,19 @@ class DatabaseConnector:
             raise Exception(f"Connection failed: {str(e)}")
 
     @staticmethod
-    def push_data(connection_string: str, data: Dict[str, List[Dict[str, Any]]]):
+    def push_data(connection_string: str, data: Dict[str, Union[ColumnarTable, List[Dict[str, Any]]]]):
+        import pandas as pd
+
         engine = create_engine(connection_string)
         
         with engine.begin() as connection:
             for table_name, rows in data.items():
-                if not rows:
+                table = as_table(rows)
+                if not table:
                     continue
                 
-                df = pd.DataFrame(rows)
+                # Built from the columns directly; typed arrays map onto numpy dtypes without per-row dicts.
+                df = pd.DataFrame({name: table.column(name) for name in table.columns}, columns=table.columns)
                 
                 df.to_sql(
                     name=table_name,
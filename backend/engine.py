@@ -1,13 +1,27 @@
 from faker import Faker
-from typing import List, Dict, Any, Set, Union
+from typing import List, Dict, Any, Set, Union, Mapping
 from models import GeneratorRequest
-from openai import OpenAI, AsyncOpenAI
 import random
 import rstr
 from jinja2 import Environment, BaseLoader
 from unidecode import unidecode
 from job_manager import job_manager
+from runtime import runtime
+from llm_providers import get_provider
+from regex_sampler import compile_regex
+from columnar import ColumnarTable
+from metrics import GenerationProfiler, observe_stage
+from rate_limiter import get_limiter, estimate_tokens, classify_error, backoff_delay, ProviderUnavailableError, ProviderRequestError, LLM_MAX_RETRIES
 import asyncio
+import itertools
+import os
+import time
+
+CHECKPOINT_EVERY_ROWS = int(os.getenv("CHECKPOINT_EVERY_ROWS", "500"))
+CHECKPOINT_EVERY_SECONDS = float(os.getenv("CHECKPOINT_EVERY_SECONDS", "30"))
+
+LLM_SYSTEM_MESSAGE = "You are a synthetic data generator. Generate FICTIONAL, CREATIVE data. Output ONE single value."
+LLM_MAX_TOKENS = 150
 
 class DotAccessWrapper:
     def __init__(self, data: Dict[str, Any]):
@@ -19,10 +33,19 @@ class DotAccessWrapper:
     def __str__(self): return str(self._data)
     def __repr__(self): return str(self._data)
 
+class AvoidSet:
+    """Values a unique cell must not take: the column's values so far (shared, not copied) plus this cell's rejects."""
+    def __init__(self, taken: Set[Any]):
+        self.taken = taken
+        self.rejected = set()
+    def __contains__(self, value): return value in self.taken or value in self.rejected
+    def __len__(self): return len(self.taken) + len(self.rejected)
+    def __iter__(self): return itertools.chain(self.taken, self.rejected)
+    def add(self, value):
+        if value not in self.taken: self.rejected.add(value)
+
 class DataEngine:
     def __init__(self):
-        self.faker = Faker()
-        self.client = OpenAI() 
         self.jinja_env = Environment(loader=BaseLoader())
         
         def filter_slugify(value, separator="."):
@@ -45,9 +68,11 @@ class DataEngine:
         except Exception as e:
             return f"Error: Template failed {str(e)}"
 
-    def _generate_regex_value(self, params: Dict[str, Any]) -> str:
+    def _generate_regex_value(self, params: Dict[str, Any], xeger: rstr.Rstr = rstr, rng: random.Random = random) -> str:
         pattern = params.get("pattern", r"[A-Z]{3}-\d{3}")
-        try: return rstr.xeger(pattern)
+        sampler = compile_regex(pattern)
+        if sampler: return sampler.sample(rng)
+        try: return xeger.xeger(pattern)
         except Exception as e: return f"Error: Invalid Regex {str(e)}"
 
     def _generate_timestamp_value(self, params: Dict[str, Any], faker_instance: Faker) -> str:
@@ -61,7 +86,7 @@ class DataEngine:
             else: return dt.strftime(fmt)
         except Exception as e: return f"Error: Date gen failed {str(e)}"
 
-    def _generate_integer_or_float_value(self, params: Dict[str, Any]) -> Union[int, float]:
+    def _generate_integer_or_float_value(self, params: Dict[str, Any], rng: random.Random = random) -> Union[int, float]:
             min_val = params.get("min", 0)
             max_val = params.get("max", 100)
             
@@ -75,15 +100,15 @@ class DataEngine:
                 
                 precision = max(get_precision(min_val), get_precision(max_val))
                 
-                val = random.uniform(float(min_val), float(max_val))
+                val = rng.uniform(float(min_val), float(max_val))
                 return round(val, precision)
             else:
-                try: return random.randint(int(min_val), int(max_val))
+                try: return rng.randint(int(min_val), int(max_val))
                 except ValueError: return 0
 
-    def _generate_boolean_value(self, params: Dict[str, Any]) -> bool:
+    def _generate_boolean_value(self, params: Dict[str, Any], rng: random.Random = random) -> bool:
         probability = params.get("probability", 50)
-        return random.random() * 100 < probability
+        return rng.random() * 100 < probability
 
     def _generate_faker_value(self, params: Dict[str, Any], faker_instance: Faker) -> Any:
         method_name = params.get("method")
@@ -94,44 +119,42 @@ class DataEngine:
         try: return faker_method(**kwargs)
         except Exception as e: return f"Error: {str(e)}"
 
-    def _generate_distribution_value(self, params: Dict[str, Any]) -> Any:
+    def _generate_distribution_value(self, params: Dict[str, Any], rng: random.Random = random) -> Any:
         options = params.get("options")
         weights = params.get("weights")
         if not options or not isinstance(options, list): return "Error: options required"
-        if not weights: return random.choice(options)
+        if not weights: return rng.choice(options)
         if len(options) != len(weights): return "Error: options/weights mismatch"
-        try: return random.choices(options, weights=weights, k=1)[0]
+        try: return rng.choices(options, weights=weights, k=1)[0]
         except Exception as e: return f"Error: {str(e)}"
 
-    def _generate_foreign_key_value(self, params: Dict[str, Any], all_generated_data: Dict[str, List[Dict[str, Any]]], avoid_values: Set[Any] = None) -> Any:
+    def _generate_foreign_key_value(self, params: Dict[str, Any], all_generated_data: Dict[str, ColumnarTable], avoid_values: Set[Any] = None, rng: random.Random = random) -> Any:
         target_table_id = params.get("table_id")
         target_column = params.get("column_name")
         if not target_table_id or not target_column: return None 
         if target_table_id not in all_generated_data: return None 
-        source_rows = all_generated_data[target_table_id]
-        if not source_rows: return None
-        available_rows = source_rows
+        source_table = all_generated_data[target_table_id]
+        if not source_table: return None
+        source_column = source_table.column(target_column)
+        if source_column is None: source_column = [None] * len(source_table)
         if avoid_values:
-            available_rows = [row for row in source_rows if row.get(target_column) not in avoid_values]
-        if not available_rows: return "Error: No unique FK values left"
-        random_row = random.choice(available_rows)
-        return (random_row.get(target_column), random_row)
-
-    async def _generate_llm_value(self, params: Dict[str, Any], current_row_context: Dict[str, Any], avoid_values: Set[str] = None, retry_count: int = 0) -> str:
-        provider = params.get("provider", "openai")
-        model = params.get("model", "gpt-4o-mini")
+            available_rows = [i for i, value in enumerate(source_column) if value not in avoid_values]
+            if not available_rows: return "Error: No unique FK values left"
+            row_index = rng.choice(available_rows)
+        else: row_index = rng.randrange(len(source_table))
+        return (source_column[row_index], source_table[row_index])
+
+    async def _generate_llm_value(self, params: Dict[str, Any], current_row_context: Dict[str, Any], avoid_values: Set[str] = None, retry_count: int = 0, profiler: GenerationProfiler = None) -> str:
+        provider_name = params.get("provider", "openai")
+        try: provider = get_provider(provider_name)
+        except ValueError as e: raise ProviderRequestError(str(e)) from e
+        model = params.get("model") or provider.default_model
         template = params.get("prompt_template", "")
         
         base_temp = float(params.get("temperature", 1.0))
         top_p = float(params.get("top_p", 1.0))
         
-        if provider == "ollama":
-            active_client = AsyncOpenAI(
-                base_url="http://ollama:11434/v1",
-                api_key="ollama" 
-            )
-        else:
-            active_client = AsyncOpenAI()
+        active_client = provider.get_client()
         
         temperature = min(base_temp + (retry_count * 0.1), 1.5)
         
@@ -139,7 +162,7 @@ class DataEngine:
         
         formatting_context = {}
         for k, v in current_row_context.items():
-            if isinstance(v, dict): formatting_context[k] = DotAccessWrapper(v)
+            if isinstance(v, Mapping): formatting_context[k] = DotAccessWrapper(v)
             else: formatting_context[k] = v
             
         try:
@@ -148,34 +171,96 @@ class DataEngine:
                 avoid_list_str = ", ".join(list(avoid_values)[-10:])
                 formatted_prompt += f"\n\nCONSTRAINT: Value MUST be unique. DO NOT use: {avoid_list_str}."
         except Exception as e: return f"Error formatting prompt: {str(e)}"
-        try:
-            system_msg = "You are a synthetic data generator. Generate FICTIONAL, CREATIVE data. Output ONE single value."
-            
-            response = await active_client.chat.completions.create(
-                model=model,
-                messages=[{"role": "system", "content": system_msg}, {"role": "user", "content": formatted_prompt}],
-                temperature=temperature, 
-                max_tokens=150, 
-                top_p=top_p
-            )
-            return response.choices[0].message.content.strip().strip('"')
-        except Exception as e: 
-            return f"{provider.capitalize()} Error: {str(e)}"
 
-    def _resolve_generation_order(self, tables: List[Any]) -> List[Any]:
-        id_to_table = {t.id: t for t in tables}
+        system_msg = LLM_SYSTEM_MESSAGE
+        max_tokens = LLM_MAX_TOKENS
+        limiter = get_limiter(provider_name, provider.limits)
+        reserved_tokens = estimate_tokens(system_msg + formatted_prompt, max_tokens)
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await limiter.acquire(reserved_tokens)
+            started = time.monotonic()
+            try:
+                response = await active_client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "system", "content": system_msg}, {"role": "user", "content": formatted_prompt}],
+                    temperature=temperature, 
+                    max_tokens=max_tokens, 
+                    top_p=top_p
+                )
+            except asyncio.CancelledError:
+                limiter.record_failure()
+                raise
+            except Exception as e:
+                retryable, retry_after = classify_error(e)
+                if profiler: profiler.record_llm(provider_name, time.monotonic() - started, "retryable_error" if retryable else "error")
+                if not retryable:
+                    limiter.record_failure()
+                    # Fail the job rather than writing the same error into every row.
+                    raise ProviderRequestError(f"{provider_name.capitalize()} Error: {str(e)}") from e
+                limiter.record_overload(retry_after)
+                if attempt == LLM_MAX_RETRIES:
+                    raise ProviderUnavailableError(f"{provider_name.capitalize()} unavailable after {LLM_MAX_RETRIES} retries: {str(e)}") from e
+                await asyncio.sleep(backoff_delay(attempt, retry_after))
+                continue
+
+            latency = time.monotonic() - started
+            usage = getattr(response, "usage", None)
+            limiter.record_success(latency, reserved_tokens, getattr(usage, "total_tokens", None))
+            content = (response.choices[0].message.content or "").strip().strip('"') if response.choices else ""
+            if profiler: profiler.record_llm(provider_name, latency, "success" if content else "empty", getattr(usage, "prompt_tokens", 0) or 0, getattr(usage, "completion_tokens", 0) or 0)
+            if content: return content
+            # Refused or filtered responses come back without content; sampling again usually gets a value.
+            if attempt == LLM_MAX_RETRIES: raise ProviderRequestError(f"{provider_name.capitalize()} returned no content after {LLM_MAX_RETRIES} retries")
+
+    def _table_dependencies(self, tables: List[Any]) -> Dict[str, Set[str]]:
+        # Table id -> ids of the tables its foreign keys point at (self-references included).
+        table_ids = {t.id for t in tables}
         dependencies = {t.id: set() for t in tables}
         for table in tables:
             for field in table.fields:
                 if field.type == "foreign_key":
                     target_id = field.params.get("table_id")
-                    if target_id and target_id in id_to_table and target_id != table.id:
-                        dependencies[table.id].add(target_id)
+                    if target_id and target_id in table_ids: dependencies[table.id].add(target_id)
+        return dependencies
+
+    def _find_dependency_cycles(self, tables: List[Any]) -> List[List[str]]:
+        """Groups of table ids whose foreign keys form a cycle (strongly connected components, Tarjan)."""
+        dependencies = self._table_dependencies(tables)
+        index, lowlink, on_stack, stack, cycles = {}, {}, set(), [], []
+
+        def visit(t_id):
+            index[t_id] = lowlink[t_id] = len(index)
+            stack.append(t_id)
+            on_stack.add(t_id)
+            for dep in sorted(dependencies[t_id]):
+                if dep not in index:
+                    visit(dep)
+                    lowlink[t_id] = min(lowlink[t_id], lowlink[dep])
+                elif dep in on_stack: lowlink[t_id] = min(lowlink[t_id], index[dep])
+            if lowlink[t_id] == index[t_id]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == t_id: break
+                if len(component) > 1 or t_id in dependencies[t_id]: cycles.append(sorted(component))
+
+        for table in tables:
+            if table.id not in index: visit(table.id)
+        return cycles
+
+    def _resolve_generation_order(self, tables: List[Any]) -> List[Any]:
+        id_to_table = {t.id: t for t in tables}
+        dependencies = {t_id: deps - {t_id} for t_id, deps in self._table_dependencies(tables).items()}
         ordered_tables = []
         while dependencies:
             ready_tables = [t_id for t_id, deps in dependencies.items() if not deps]
             if not ready_tables:
+                # Foreign keys into a table generated later resolve to None; /generate/plan reports these cycles.
                 remaining = list(dependencies.keys())
+                print(f"Warning: circular foreign keys between tables {remaining}, generating them in declaration order")
                 for t_id in remaining: ordered_tables.append(id_to_table[t_id])
                 break
             ready_tables.sort()
@@ -186,29 +271,92 @@ class DataEngine:
                 dependencies[t_id] = dependencies[t_id] - set(ready_tables)
         return ordered_tables
 
-    async def generate(self, request: GeneratorRequest, job_id: str = None) -> Dict[str, List[Dict[str, Any]]]:
-        generated_tables_data: Dict[str, List[Dict[str, Any]]] = {}
+    def _build_checkpoint_state(self, rng: random.Random, completed_tables: List[str], table_id: str, rows_done: int, rows_generated: int, regex_streams: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Unique trackers are not saved: they are rebuilt from the checkpointed rows on resume (_rebuild_unique_tracker).
+        return {
+            "rng_state": rng.getstate(),
+            "completed_tables": completed_tables,
+            "table_id": table_id,
+            "rows_done": rows_done,
+            "regex_streams": {name: stream.state() for name, stream in (regex_streams or {}).items()},
+            "rows_generated": rows_generated
+        }
+
+    def _rebuild_unique_tracker(self, table_rows: ColumnarTable, unique_tracker: Dict[str, set]):
+        # Every accepted value of a unique column is in the rows; the rest of the column is error strings.
+        for name in unique_tracker:
+            unique_tracker[name] = {value for value in (table_rows.column(name) or []) if "Error" not in str(value)}
+
+    def _create_regex_streams(self, table: Any, rng: random.Random, saved_states: Dict[str, Any] = None) -> Dict[str, Any]:
+        # Unique regex columns walk a random permutation of the pattern's domain instead of retrying on collisions.
+        # Used when that keeps the column's distribution (fixed-shape patterns) or when the table would nearly exhaust
+        # the domain, where rejection sampling stops working.
+        streams = {}
+        for field in table.fields:
+            if field.type != "regex" or not field.is_unique: continue
+            sampler = compile_regex(field.params.get("pattern", r"[A-Z]{3}-\d{3}"))
+            if not sampler: continue
+            if not sampler.is_uniform and table.rows_count * 2 < sampler.domain_size: continue
+            streams[field.name] = sampler.unique_stream(rng, (saved_states or {}).get(field.name))
+        return streams
+
+    async def generate(self, request: GeneratorRequest, job_id: str = None, profiler: GenerationProfiler = None, lease: str = None) -> Dict[str, ColumnarTable]:
+        if profiler is None: profiler = GenerationProfiler()
+        requested_locale = request.config.locale or "en_US"
+        job_faker = runtime.faker_pool.acquire(requested_locale)
+        try: return await self._generate_tables(request, job_id, profiler, job_faker, lease)
+        finally: runtime.faker_pool.release(job_faker)
+
+    async def _generate_tables(self, request: GeneratorRequest, job_id: str, profiler: GenerationProfiler, job_faker: Faker, lease: str = None) -> Dict[str, ColumnarTable]:
+        generated_tables_data: Dict[str, ColumnarTable] = {}
         table_id_to_name = {t.id: t.name for t in request.tables}
         ordered_tables = self._resolve_generation_order(request.tables)
 
-        requested_locale = request.config.locale or "en_US"
-        try: job_faker = Faker(requested_locale)
-        except Exception: job_faker = Faker("en_US")
+        # One RNG drives Faker, regex and the built-in generators, so a single state snapshot is enough to resume a job.
+        rng = random.Random(request.config.seed)
+        job_faker.random = rng
+        job_xeger = rstr.Rstr(rng)
 
         total_rows_to_gen = sum(t.rows_count for t in request.tables)
         current_rows_gen = 0
+
+        checkpoint = None
+        if job_id:
+            with observe_stage("redis", profiler): checkpoint = job_manager.load_checkpoint(job_id)
+        completed_tables: List[str] = []
+        if checkpoint:
+            state = checkpoint["state"]
+            rng_state = state["rng_state"]
+            rng.setstate((rng_state[0], tuple(rng_state[1]), rng_state[2]))
+            completed_tables = list(state["completed_tables"])
+            for t_id in completed_tables: generated_tables_data[t_id] = (checkpoint["rows"].get(t_id) or ColumnarTable([])).seal()
+            current_rows_gen = state["rows_generated"]
+            print(f"Resuming job {job_id} from checkpoint at {current_rows_gen}/{total_rows_to_gen} rows")
         
         if job_id:
-            job_manager.set_total(job_id, total_rows_to_gen)
-            job_manager.update_progress(job_id, 0) 
+            with observe_stage("redis", profiler):
+                job_manager.set_total(job_id, total_rows_to_gen)
+                job_manager.update_progress(job_id, int((current_rows_gen / total_rows_to_gen) * 100) if total_rows_to_gen > 0 else 0)
 
         for table in ordered_tables:
-            table_rows = []
+            if table.id in completed_tables: continue
+
+            table_rows = ColumnarTable([field.name for field in table.fields])
             unique_tracker: Dict[str, set] = {}
             for field in table.fields:
                 if field.is_unique: unique_tracker[field.name] = set()
 
             rows_generated_for_table = 0
+            if checkpoint and checkpoint["state"]["table_id"] == table.id:
+                table_rows = checkpoint["rows"].get(table.id) or table_rows
+                rows_generated_for_table = checkpoint["state"]["rows_done"]
+                self._rebuild_unique_tracker(table_rows, unique_tracker)
+                regex_streams = self._create_regex_streams(table, rng, checkpoint["state"].get("regex_streams"))
+            else:
+                regex_streams = self._create_regex_streams(table, rng)
+
+            checkpointed_rows = rows_generated_for_table
+            last_checkpoint_at = time.monotonic()
             
             BATCH_SIZE = 10
 
@@ -229,8 +377,9 @@ class DataEngine:
                         max_retries = 10 
                         attempts = 0
                         final_value = None
-                        current_avoid_list = set()
-                        if field.is_unique: current_avoid_list.update(unique_tracker[field.name])
+                        current_avoid_list = AvoidSet(unique_tracker[field.name]) if field.is_unique else set()
+                        timed = profiler.sample(table.name, field.name)
+                        if timed: field_started = time.perf_counter()
                         
                         while attempts < max_retries:
                             generated_val = None
@@ -238,19 +387,23 @@ class DataEngine:
                             if field.type == "faker": generated_val = self._generate_faker_value(field.params, job_faker)
                             elif field.type == "timestamp": generated_val = self._generate_timestamp_value(field.params, job_faker)
                             elif field.type == "foreign_key":
-                                result = self._generate_foreign_key_value(field.params, generated_tables_data, current_avoid_list)
+                                result = self._generate_foreign_key_value(field.params, generated_tables_data, current_avoid_list, rng)
                                 if result and not isinstance(result, str):
                                     val, parent_row = result
                                     generated_val = val
                                     context_data[field.name] = parent_row 
                                 else: generated_val = result if result else "Error: FK Failed"
-                            elif field.type == "distribution": generated_val = self._generate_distribution_value(field.params)
-                            elif field.type == "integer": generated_val = self._generate_integer_or_float_value(field.params)
-                            elif field.type == "boolean": generated_val = self._generate_boolean_value(field.params)
-                            elif field.type == "regex": generated_val = self._generate_regex_value(field.params)
+                            elif field.type == "distribution": generated_val = self._generate_distribution_value(field.params, rng)
+                            elif field.type == "integer": generated_val = self._generate_integer_or_float_value(field.params, rng)
+                            elif field.type == "boolean": generated_val = self._generate_boolean_value(field.params, rng)
+                            elif field.type == "regex":
+                                if field.name in regex_streams:
+                                    generated_val = regex_streams[field.name].next()
+                                    if generated_val is None: generated_val = f"Error: No unique values left for {field.name}"
+                                else: generated_val = self._generate_regex_value(field.params, job_xeger, rng)
                             
                             elif field.type == "llm": 
-                                generated_val = await self._generate_llm_value(field.params, context_data, current_avoid_list, attempts)
+                                generated_val = await self._generate_llm_value(field.params, context_data, current_avoid_list, attempts, profiler)
                             
                             elif field.type == "template": generated_val = self._generate_template_value(field.params, context_data)
                             
@@ -261,7 +414,7 @@ class DataEngine:
                                     break
                                 else:
                                     attempts += 1
-                                    if field.type == "foreign_key" and "Error" in str(generated_val):
+                                    if field.type in ("foreign_key", "regex") and "Error" in str(generated_val):
                                         final_value = generated_val
                                         break
                                     current_avoid_list.add(generated_val)
@@ -270,6 +423,7 @@ class DataEngine:
                                 break
 
                         if field.is_unique and attempts == max_retries: final_value = f"Error: Uniqueness failed for {field.name}"
+                        profiler.record_field(table.name, field.name, field.type, time.perf_counter() - field_started if timed else None, attempts)
                         
                         row_data[field.name] = final_value
                         if field.type != "foreign_key": context_data[field.name] = final_value
@@ -278,15 +432,25 @@ class DataEngine:
                 
                 rows_generated_for_table += current_batch
                 current_rows_gen += current_batch
+                profiler.rows += current_batch
                 
                 if job_id and total_rows_to_gen > 0:
                     percent = int((current_rows_gen / total_rows_to_gen) * 100)
-                    job_manager.update_progress(job_id, percent)
+                    with observe_stage("redis", profiler): job_manager.update_progress(job_id, percent)
+
+                table_done = rows_generated_for_table >= table.rows_count
+                due = rows_generated_for_table - checkpointed_rows >= CHECKPOINT_EVERY_ROWS or time.monotonic() - last_checkpoint_at >= CHECKPOINT_EVERY_SECONDS
+                if job_id and (table_done or due):
+                    if table_done: completed_tables.append(table.id)
+                    state = self._build_checkpoint_state(rng, completed_tables, None if table_done else table.id, rows_generated_for_table, current_rows_gen, regex_streams)
+                    with observe_stage("redis", profiler): job_manager.save_checkpoint(job_id, table.id, table_rows.to_json_dict(checkpointed_rows), state, lease)
+                    checkpointed_rows = rows_generated_for_table
+                    last_checkpoint_at = time.monotonic()
 
-            generated_tables_data[table.id] = table_rows
+            generated_tables_data[table.id] = table_rows.seal()
 
         final_output = {}
-        for t_id, rows in generated_tables_data.items():
-            t_name = table_id_to_name.get(t_id, t_id)
-            final_output[t_name] = rows
-        return final_output
\ No newline at end of file
+        for table in ordered_tables:
+            t_name = table_id_to_name.get(table.id, table.id)
+            final_output[t_name] = generated_tables_data.get(table.id) or ColumnarTable([f.name for f in table.fields])
+        return final_output
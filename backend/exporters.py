@@ -1,50 +1,52 @@
 import csv
 import io
 import zipfile
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Union
+from columnar import ColumnarTable, as_table
+
+TablesData = Dict[str, Union[ColumnarTable, List[Dict[str, Any]]]]
 
 class DataExporter:
     @staticmethod
-    def to_csv_zip(tables_data: Dict[str, List[Dict[str, Any]]]) -> bytes:
+    def to_csv_zip(tables_data: TablesData) -> bytes:
         """
         Creates a ZIP file containing a CSV file for each table.
         """
         zip_buffer = io.BytesIO()
-        
+
         with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_file:
             for table_name, rows in tables_data.items():
-                if not rows:
+                table = as_table(rows)
+                if not table:
                     continue
-                
+
                 csv_buffer = io.StringIO()
-                headers = rows[0].keys()
-                writer = csv.DictWriter(csv_buffer, fieldnames=headers)
-                writer.writeheader()
-                writer.writerows(rows)
-                
+                writer = csv.writer(csv_buffer, lineterminator="\r\n")
+                writer.writerow(table.columns)
+                writer.writerows(table.iter_tuples())
+
                 zip_file.writestr(f"{table_name}.csv", csv_buffer.getvalue())
-        
+
         return zip_buffer.getvalue()
 
     @staticmethod
-    def to_sql(tables_data: Dict[str, List[Dict[str, Any]]]) -> str:
+    def to_sql(tables_data: TablesData) -> str:
         """
         Converts multiple tables to a single SQL script string.
         """
         all_sql_statements = []
 
         for table_name, rows in tables_data.items():
-            if not rows:
+            table = as_table(rows)
+            if not table:
                 continue
 
             all_sql_statements.append(f"-- Table: {table_name}")
-            headers = list(rows[0].keys())
-            columns = ", ".join(headers)
-            
-            for row in rows:
+            columns = ", ".join(table.columns)
+
+            for row in table.iter_tuples():
                 values = []
-                for header in headers:
-                    val = row.get(header)
+                for val in row:
                     if val is None:
                         values.append("NULL")
                     elif isinstance(val, (int, float)):
@@ -52,11 +54,11 @@ class DataExporter:
                     else:
                         clean_val = str(val).replace("'", "''")
                         values.append(f"'{clean_val}'")
-                
+
                 value_str = ", ".join(values)
                 statement = f"INSERT INTO {table_name} ({columns}) VALUES ({value_str});"
                 all_sql_statements.append(statement)
-            
+
             all_sql_statements.append("")
 
-        return "\n".join(all_sql_statements)
\ No newline at end of file
+        return "\n".join(all_sql_statements)
@@ -2,8 +2,16 @@ import json
 import redis
 import os
 from datetime import datetime
+from metrics import observe_stage
+from columnar import ColumnarTable, encode_tables, decode_tables
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+# A running job holds a lease renewed at every checkpoint, so a redelivered copy of its task cannot run alongside it.
+# Must outlast the longest gap between two checkpoints (one batch of rows, including LLM retries).
+JOB_LEASE_TTL = int(os.getenv("JOB_LEASE_TTL", "600"))
+
+class LeaseLostError(Exception):
+    """Raised when a checkpoint is written by a run that no longer holds the job's lease."""
 
 class RedisJobManager:
     def __init__(self):
@@ -13,7 +21,7 @@ class RedisJobManager:
     def _get_key(self, job_id):
         return f"job:{job_id}"
 
-    def create_job(self, job_id, config):
+    def create_job(self, job_id, config, owner=None, result_of=None):
         job_data = {
             "id": job_id,
             "status": "pending",
@@ -22,27 +30,42 @@ class RedisJobManager:
             "created_at": datetime.now().isoformat(),
             "config": json.dumps(config),
             "data": "",
-            "error": ""
+            "error": "",
+            "owner": owner or "",
+            "result_of": result_of or ""
         }
         
         self.redis.hset(self._get_key(job_id), mapping=job_data)
         self.redis.expire(self._get_key(job_id), self.TTL)
+        # Jobs reusing another job's result keep that job alive for at least as long as themselves.
+        if result_of: self.redis.expire(self._get_key(result_of), self.TTL, gt=True)
         return job_data
 
     def get_job(self, job_id):
         data = self.redis.hgetall(self._get_key(job_id))
         if not data:
             return None
+
+        if data.get("result_of"):
+            source = self.redis.hgetall(self._get_key(data["result_of"]))
+            if source:
+                for key in ("status", "progress", "total_rows", "error", "data", "metrics"):
+                    if key in source: data[key] = source[key]
+            else:
+                data.update({"status": "failed", "error": "Source result expired"})
         
         try:
             if "config" in data and data["config"]: 
                 data["config"] = json.loads(data["config"])
             
             if "data" in data and data["data"]:
-                data["data"] = json.loads(data["data"])
+                data["data"] = decode_tables(json.loads(data["data"]))
             else:
                 data["data"] = None
 
+            if "metrics" in data and data["metrics"]:
+                data["metrics"] = json.loads(data["metrics"])
+
             if "progress" in data: data["progress"] = int(data["progress"])
             if "total_rows" in data: data["total_rows"] = int(data["total_rows"])
         except Exception as e:
@@ -50,18 +73,87 @@ class RedisJobManager:
             
         return data
 
+    def get_status(self, job_id):
+        status, result_of = self.redis.hmget(self._get_key(job_id), ["status", "result_of"])
+        if result_of: return self.redis.hget(self._get_key(result_of), "status") or "failed"
+        return status
+
+    @staticmethod
+    def can_access(job, username):
+        # Jobs created before ownership was recorded stay visible to every user.
+        return not job.get("owner") or job["owner"] == username
+
     def update_progress(self, job_id, progress):
         self.redis.hset(self._get_key(job_id), key="progress", value=progress)
 
     def set_total(self, job_id, total):
         self.redis.hset(self._get_key(job_id), key="total_rows", value=total)
 
-    def complete_job(self, job_id, result_data):
-        self.redis.hset(self._get_key(job_id), mapping={
+    def complete_job(self, job_id, result_data, profiler=None):
+        with observe_stage("serialization", profiler):
+            data = json.dumps(encode_tables(result_data))
+        mapping = {
             "status": "completed",
             "progress": 100,
-            "data": json.dumps(result_data)
-        })
+            "data": data
+        }
+        if profiler: mapping["metrics"] = json.dumps(profiler.to_dict())
+        self.redis.hset(self._get_key(job_id), mapping=mapping)
+
+    def record_export(self, job_id, output_format, seconds):
+        self.redis.hincrbyfloat(self._get_key(job_id), f"export_seconds_{output_format}", seconds)
+
+    def _lease_key(self, job_id): return f"{self._get_key(job_id)}:lease"
+
+    def acquire_lease(self, job_id, holder) -> bool:
+        return bool(self.redis.set(self._lease_key(job_id), holder, nx=True, ex=JOB_LEASE_TTL))
+
+    def release_lease(self, job_id, holder):
+        if self.redis.get(self._lease_key(job_id)) == holder: self.redis.delete(self._lease_key(job_id))
+
+    def count_run(self, job_id) -> int:
+        return self.redis.hincrby(self._get_key(job_id), "runs", 1)
+
+    def save_checkpoint(self, job_id, table_id, rows_chunk, state, lease=None):
+        # rows_chunk is ColumnarTable.to_json_dict() of the rows added since the previous checkpoint.
+        # Rows are appended as chunks so each checkpoint only ships what was generated since the previous one;
+        # the transaction keeps the chunk list and the resume state consistent if the worker dies mid-write.
+        # With a lease, the write only happens while that lease is still held, and renews it.
+        rows_key = f"{self._get_key(job_id)}:rows:{table_id}"
+        checkpoint_key = f"{self._get_key(job_id)}:checkpoint"
+        with self.redis.pipeline() as pipe:
+            if lease:
+                pipe.watch(self._lease_key(job_id))
+                if pipe.get(self._lease_key(job_id)) != lease: raise LeaseLostError(f"Job {job_id} is owned by another run")
+                pipe.multi()
+                pipe.expire(self._lease_key(job_id), JOB_LEASE_TTL)
+            if rows_chunk and rows_chunk["length"]:
+                pipe.rpush(rows_key, json.dumps(rows_chunk, default=str))
+                pipe.expire(rows_key, self.TTL)
+            pipe.hset(checkpoint_key, mapping={"state": json.dumps(state, default=str)})
+            pipe.sadd(f"{checkpoint_key}:tables", table_id)
+            pipe.expire(checkpoint_key, self.TTL)
+            pipe.expire(f"{checkpoint_key}:tables", self.TTL)
+            try: pipe.execute()
+            except redis.exceptions.WatchError: raise LeaseLostError(f"Job {job_id} lease changed during checkpoint")
+
+    def load_checkpoint(self, job_id):
+        checkpoint_key = f"{self._get_key(job_id)}:checkpoint"
+        raw_state = self.redis.hget(checkpoint_key, "state")
+        if not raw_state:
+            return None
+
+        rows = {}
+        for table_id in self.redis.smembers(f"{checkpoint_key}:tables"):
+            chunks = self.redis.lrange(f"{self._get_key(job_id)}:rows:{table_id}", 0, -1)
+            rows[table_id] = ColumnarTable.from_chunks([json.loads(chunk) for chunk in chunks])
+        return {"state": json.loads(raw_state), "rows": rows}
+
+    def clear_checkpoint(self, job_id):
+        checkpoint_key = f"{self._get_key(job_id)}:checkpoint"
+        table_ids = self.redis.smembers(f"{checkpoint_key}:tables")
+        keys = [checkpoint_key, f"{checkpoint_key}:tables"] + [f"{self._get_key(job_id)}:rows:{t_id}" for t_id in table_ids]
+        self.redis.delete(*keys)
 
     def fail_job(self, job_id, error_msg):
         self.redis.hset(self._get_key(job_id), mapping={
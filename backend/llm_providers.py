@@ -0,0 +1,190 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import weakref
+from typing import Any, Dict, Optional
+
+# Built-in providers. Every entry except "stub" talks to an OpenAI-compatible /v1 API, so vLLM, LM Studio,
+# llama.cpp server etc. only need a base_url. Extra or overridden entries can be passed as JSON in LLM_PROVIDERS, e.g.
+# LLM_PROVIDERS='{"vllm": {"base_url": "http://gpu-box:8000/v1", "default_model": "Qwen/Qwen2.5-7B-Instruct"}}'
+DEFAULT_PROVIDERS: Dict[str, Dict[str, Any]] = {
+    "openai": {
+        "kind": "openai",
+        "base_url": os.getenv("OPENAI_BASE_URL"),
+        "api_key": None,
+        "default_model": "gpt-4o-mini",
+        "limits": {
+            "requests_per_minute": int(os.getenv("OPENAI_RPM", "500")),
+            "tokens_per_minute": int(os.getenv("OPENAI_TPM", "200000")),
+            "max_concurrency": int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+            "latency_target": float(os.getenv("OPENAI_LATENCY_TARGET", "20")),
+        },
+    },
+    "ollama": {
+        "kind": "openai",
+        "base_url": os.getenv("OLLAMA_BASE_URL", "http://ollama:11434/v1"),
+        "api_key": "ollama",
+        "default_model": "llama3",
+        "limits": {
+            "requests_per_minute": int(os.getenv("OLLAMA_RPM", "0")),
+            "tokens_per_minute": int(os.getenv("OLLAMA_TPM", "0")),
+            "max_concurrency": int(os.getenv("OLLAMA_MAX_CONCURRENCY", "4")),
+            "latency_target": float(os.getenv("OLLAMA_LATENCY_TARGET", "30")),
+        },
+    },
+    "vllm": {
+        "kind": "openai",
+        "base_url": os.getenv("VLLM_BASE_URL", "http://vllm:8000/v1"),
+        "api_key": os.getenv("VLLM_API_KEY", "EMPTY"),
+        "default_model": os.getenv("VLLM_MODEL", "meta-llama/Meta-Llama-3-8B-Instruct"),
+        "limits": {
+            "requests_per_minute": int(os.getenv("VLLM_RPM", "0")),
+            "tokens_per_minute": int(os.getenv("VLLM_TPM", "0")),
+            "max_concurrency": int(os.getenv("VLLM_MAX_CONCURRENCY", "32")),
+            "latency_target": float(os.getenv("VLLM_LATENCY_TARGET", "30")),
+        },
+    },
+    "stub": {
+        "kind": "stub",
+        "default_model": "stub",
+        "options": {
+            "latency_ms": float(os.getenv("STUB_LLM_LATENCY_MS", "0")),
+            "tokens_per_second": float(os.getenv("STUB_LLM_TOKENS_PER_SECOND", "0")),
+            "max_concurrency": int(os.getenv("STUB_LLM_MAX_CONCURRENCY", "0")),
+            "error_rate": float(os.getenv("STUB_LLM_ERROR_RATE", "0")),
+            "seed": int(os.getenv("STUB_LLM_SEED", "0")),
+        },
+        # Client-side limiter window, unlike STUB_LLM_MAX_CONCURRENCY which models the fake server's capacity.
+        "limits": {"max_concurrency": int(os.getenv("STUB_LLM_LIMITER_CONCURRENCY", "64"))},
+    },
+}
+
+class _Obj:
+    def __init__(self, **kwargs): self.__dict__.update(kwargs)
+
+class StubChatClient:
+    """
+    In-process stand-in for an OpenAI-compatible chat API.
+    The reply is a hash of model, messages and sampling parameters, so a given prompt always yields the same value
+    while the uniqueness retries (which raise the temperature) still get a new one. latency_ms and tokens_per_second
+    model response time, max_concurrency models server capacity (0 = unlimited) and error_rate injects 429s.
+    """
+    def __init__(self, latency_ms: float = 0, tokens_per_second: float = 0, max_concurrency: int = 0, error_rate: float = 0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.tokens_per_second = tokens_per_second
+        self.max_concurrency = max_concurrency
+        self.error_rate = error_rate
+        self.in_flight = 0
+        self._errors = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = _Obj(completions=_Obj(create=self.create))
+
+    async def _enter(self):
+        while True:
+            with self._lock:
+                if not self.max_concurrency or self.in_flight < self.max_concurrency:
+                    self.in_flight += 1
+                    return
+            await asyncio.sleep(0.001)
+
+    def _exit(self):
+        with self._lock: self.in_flight -= 1
+
+    def _rate_limited(self):
+        import httpx
+        import openai
+
+        request = httpx.Request("POST", "http://stub/v1/chat/completions")
+        response = httpx.Response(429, headers={"retry-after-ms": "10"}, request=request)
+        return openai.RateLimitError("Stub provider rate limit", response=response, body=None)
+
+    async def create(self, model: str, messages: list, temperature: float = 1.0, max_tokens: int = 150, top_p: float = 1.0, **kwargs):
+        await self._enter()
+        try:
+            with self._lock: fail = self.error_rate and self._errors.random() < self.error_rate
+            if fail: raise self._rate_limited()
+
+            payload = json.dumps([model, messages, round(temperature, 4), round(top_p, 4)], sort_keys=True)
+            digest = hashlib.sha1(payload.encode()).hexdigest()
+            content = f"{model}-{digest[:12]}"
+
+            prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4 + 1
+            completion_tokens = min(max_tokens, len(content) // 4 + 1)
+            delay = self.latency_ms / 1000.0
+            if self.tokens_per_second: delay += completion_tokens / self.tokens_per_second
+            if delay: await asyncio.sleep(delay)
+
+            usage = _Obj(prompt_tokens=prompt_tokens, completion_tokens=completion_tokens, total_tokens=prompt_tokens + completion_tokens)
+            return _Obj(choices=[_Obj(message=_Obj(content=content))], usage=usage, model=model)
+        finally:
+            self._exit()
+
+class LLMProvider:
+    def __init__(self, name: str, kind: str = "openai", base_url: Optional[str] = None, api_key: Optional[str] = None, default_model: Optional[str] = None, limits: Optional[Dict[str, Any]] = None, options: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.base_url = base_url
+        self.api_key = api_key
+        self.default_model = default_model
+        self.limits = limits or {}
+        self.options = options or {}
+        self._clients = weakref.WeakKeyDictionary()
+        self._stub_client = None
+        self._lock = threading.Lock()
+
+    def _create_client(self):
+        from openai import AsyncOpenAI
+
+        kwargs = {"max_retries": 0}  # retries go through rate_limiter
+        if self.base_url: kwargs["base_url"] = self.base_url
+        if self.api_key: kwargs["api_key"] = self.api_key
+        return AsyncOpenAI(**kwargs)
+
+    def get_client(self):
+        if self.kind == "stub":
+            with self._lock:
+                if self._stub_client is None: self._stub_client = StubChatClient(**self.options)
+                return self._stub_client
+        # httpx async clients are bound to the loop they first ran on, so keep one per event loop.
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            client = self._clients.get(loop)
+            if client is None:
+                client = self._create_client()
+                self._clients[loop] = client
+            return client
+
+_registry: Dict[str, LLMProvider] = {}
+_registry_lock = threading.Lock()
+
+def register_provider(name: str, **config) -> LLMProvider:
+    provider = LLMProvider(name, **config)
+    with _registry_lock: _registry[name] = provider
+    return provider
+
+def get_provider(name: str) -> LLMProvider:
+    with _registry_lock: provider = _registry.get(name)
+    if provider is None: raise ValueError(f"Unknown LLM provider '{name}'")
+    return provider
+
+def list_providers() -> Dict[str, Dict[str, Any]]:
+    with _registry_lock:
+        return {name: {"kind": p.kind, "base_url": p.base_url, "default_model": p.default_model} for name, p in _registry.items()}
+
+def _load_registry():
+    configs = {name: dict(config) for name, config in DEFAULT_PROVIDERS.items()}
+    overrides = os.getenv("LLM_PROVIDERS")
+    if overrides:
+        try:
+            for name, config in json.loads(overrides).items():
+                configs[name] = {**configs.get(name, {}), **config}
+        except (ValueError, AttributeError) as e:
+            print(f"Warning: ignoring invalid LLM_PROVIDERS: {e}")
+    for name, config in configs.items():
+        try: register_provider(name, **config)
+        except TypeError as e: print(f"Warning: ignoring LLM provider '{name}': {e}")
+
+_load_registry()
@@ -1,5 +1,7 @@
 from fastapi import FastAPI, HTTPException, Response, Depends, WebSocket, WebSocketDisconnect, status
+from fastapi.encoders import jsonable_encoder
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from typing import List, Union, Any
@@ -7,14 +9,20 @@ import uvicorn
 import asyncio
 import json
 import uuid
+import time
 from dotenv import load_dotenv
 
 from models import GeneratorRequest, ProjectCreate, ProjectSummary, PushToDbRequest
-from db_connector import DatabaseConnector
-from engine import DataEngine
 from exporters import DataExporter
+from columnar import as_table
 from database import init_db, get_db, ProjectDB, UserDB # Import UserDB
 from job_manager import job_manager
+from runtime import runtime
+from result_cache import result_cache, request_fingerprint
+from planner import JobPlanner
+from metrics import GenerationProfiler, observe_stage, render_metrics, register_collector, SYNC_REQUESTS
+from scheduling import scheduler, QueueDepthCollector
+from sync_executor import sync_executor, offload_gate, ExecutorSaturated, SYNC_MAX_ROWS, SYNC_RETRY_AFTER, SYNC_OFFLOAD_TIMEOUT, SYNC_POLL_INTERVAL
 from tasks import generate_dataset_task
 # Importy Auth
 from auth import get_current_user, create_access_token, verify_password, get_password_hash
@@ -50,7 +58,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-data_engine = DataEngine()
+data_engine = runtime.get_engine()
+planner = JobPlanner(data_engine)
+register_collector(QueueDepthCollector(scheduler))
 
 @app.post("/token")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
@@ -68,39 +78,141 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 def read_root():
     return {"status": "ok", "message": "API Running (Protected)"}
 
+@app.get("/metrics")
+def prometheus_metrics():
+    content, content_type = render_metrics()
+    return Response(content=content, media_type=content_type)
+
 def format_generation_output(data: dict, config) -> Any:
     format_type = config.output_format.lower()
+    with observe_stage(f"export_{format_type}"):
+        return _format_generation_output(data, config, format_type)
+
+def _format_generation_output(data: dict, config, format_type: str) -> Any:
     if format_type == "json":
         total_rows = sum(len(rows) for rows in data.values())
-        return {"status": "success", "job_name": config.job_name, "tables_count": len(data), "total_rows": total_rows, "data": data}
+        return {"status": "success", "job_name": config.job_name, "tables_count": len(data), "total_rows": total_rows, "data": {name: as_table(rows).to_rows() for name, rows in data.items()}}
     elif format_type == "csv": return DataExporter.to_csv_zip(data)
     elif format_type == "sql": return DataExporter.to_sql(data)
     else: raise ValueError("Unsupported output format")
 
-def create_file_response(content: Union[str, bytes], config) -> Response:
+def file_headers(config) -> dict:
     format_type = config.output_format.lower()
     if format_type == "csv":
-        return Response(content=content, media_type="application/zip", headers={"Content-Disposition": f"attachment; filename={config.job_name}.zip"})
+        return {"media_type": "application/zip", "headers": {"Content-Disposition": f"attachment; filename={config.job_name}.zip"}}
     elif format_type == "sql":
         file_name = config.job_name.replace(" ", "_").lower()
-        return Response(content=content, media_type="application/sql", headers={"Content-Disposition": f"attachment; filename={file_name}.sql"})
-    return content
+        return {"media_type": "application/sql", "headers": {"Content-Disposition": f"attachment; filename={file_name}.sql"}}
+    return {"media_type": "application/json", "headers": {}}
+
+def create_file_response(content: Union[str, bytes], config) -> Response:
+    if config.output_format.lower() == "json": return content
+    return Response(content=content, **file_headers(config))
+
+def generate_and_format(request: GeneratorRequest) -> Response:
+    # Runs on a sync executor thread, so generation, export and JSON encoding all stay off the event loop.
+    profiler = GenerationProfiler()
+    with observe_stage("generation", profiler):
+        raw_data = sync_executor.run_coroutine(data_engine.generate(request, profiler=profiler))
+    profiler.publish()
+    formatted_output = format_generation_output(raw_data, request.config)
+    if request.config.output_format.lower() == "json": return JSONResponse(content=jsonable_encoder(formatted_output))
+    return create_file_response(formatted_output, request.config)
+
+def stream_job_result(job_id: str, config, chunk_rows: int = 1000, chunk_size: int = 1 << 16):
+    # Sync generator: Starlette iterates it in a threadpool. JSON rows are built a chunk at a time from the columns.
+    data = (job_manager.get_job(job_id) or {}).get("data") or {}
+    format_type = config.output_format.lower()
+    if format_type == "json":
+        envelope = json.dumps({"status": "success", "job_name": config.job_name, "tables_count": len(data), "total_rows": sum(len(t) for t in data.values())})
+        yield envelope[:-1] + ', "data": {'
+        for position, (name, table) in enumerate(data.items()):
+            yield f'{", " if position else ""}{json.dumps(name)}: ['
+            for start in range(0, len(table), chunk_rows):
+                yield (", " if start else "") + json.dumps(table.to_rows(start, start + chunk_rows))[1:-1]
+            yield "]"
+        yield "}}"
+        return
+    started = time.perf_counter()
+    content = format_generation_output(data, config)
+    job_manager.record_export(job_id, format_type, time.perf_counter() - started)
+    for start in range(0, len(content), chunk_size): yield content[start:start + chunk_size]
+
+async def generate_via_worker(request: GeneratorRequest, username: str) -> Response:
+    # Admitted against offload_gate; Redis calls go through a thread so polling never blocks the event loop.
+    with offload_gate.slot():
+        job_id = (await asyncio.to_thread(submit_generation_job, request, username))["job_id"]
+        deadline = time.monotonic() + SYNC_OFFLOAD_TIMEOUT
+        while (job_status := await asyncio.to_thread(job_manager.get_status, job_id)) not in ("completed", "failed"):
+            if time.monotonic() > deadline: raise HTTPException(status_code=504, detail=f"Generation still running, fetch /jobs/{job_id}/result later")
+            await asyncio.sleep(SYNC_POLL_INTERVAL)
+        if job_status == "failed":
+            job = await asyncio.to_thread(job_manager.get_job, job_id) or {}
+            raise HTTPException(status_code=500, detail=job.get("error") or "Generation failed")
+    response = file_headers(request.config)
+    response["headers"]["X-Job-Id"] = job_id
+    return StreamingResponse(stream_job_result(job_id, request.config), **response)
 
 @app.post("/generate")
 async def generate_data_sync(request: GeneratorRequest, user: dict = Depends(get_current_user)):
+    if SYNC_MAX_ROWS and sum(table.rows_count for table in request.tables) > SYNC_MAX_ROWS:
+        try: response = await generate_via_worker(request, user.username)
+        except ExecutorSaturated as e:
+            SYNC_REQUESTS.labels(outcome="rejected").inc()
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(SYNC_RETRY_AFTER)})
+        SYNC_REQUESTS.labels(outcome="offloaded").inc()
+        return response
     try:
-        raw_data = await data_engine.generate(request)
-        formatted_output = format_generation_output(raw_data, request.config)
-        if request.config.output_format.lower() == "json": return formatted_output
-        else: return create_file_response(formatted_output, request.config)
-    except Exception as e: raise HTTPException(status_code=500, detail=str(e))
+        response = await sync_executor.submit(generate_and_format, request)
+        SYNC_REQUESTS.labels(outcome="completed").inc()
+        return response
+    except ExecutorSaturated as e:
+        SYNC_REQUESTS.labels(outcome="rejected").inc()
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(SYNC_RETRY_AFTER)})
+    except Exception as e:
+        SYNC_REQUESTS.labels(outcome="failed").inc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+def plan_generation_job(request: GeneratorRequest) -> dict:
+    return sync_executor.run_coroutine(planner.plan(request, SYNC_MAX_ROWS))
+
+@app.post("/generate/plan")
+async def plan_generation(request: GeneratorRequest, user: dict = Depends(get_current_user)):
+    # Dry run: samples the schema on the sync executor, so it shares the sync endpoint's admission limits.
+    try: return await sync_executor.submit(plan_generation_job, request)
+    except ExecutorSaturated as e: raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(SYNC_RETRY_AFTER)})
+
+def submit_generation_job(request: GeneratorRequest, username: str) -> dict:
+    job_id = str(uuid.uuid4())
+    fingerprint = request_fingerprint(request)
+    if fingerprint:
+        cached_job_id = result_cache.lookup(username, fingerprint)
+        if cached_job_id:
+            job_manager.create_job(job_id, request.model_dump(), owner=username, result_of=cached_job_id)
+            return {"job_id": job_id, "status": "completed", "cached": True}
+        running_job_id = result_cache.claim(username, fingerprint, job_id)
+        if running_job_id:
+            job_manager.create_job(job_id, request.model_dump(), owner=username, result_of=running_job_id)
+            return {"job_id": job_id, "status": "queued", "cached": True}
+    route = None
+    try:
+        job_manager.create_job(job_id, request.model_dump(), owner=username)
+        route = scheduler.route(request, username)
+        generate_dataset_task.apply_async((job_id, request.model_dump_json(), fingerprint, username, route["workload"]), queue=route["queue"], priority=route["priority"])
+    except Exception as e:
+        # Undo the claim and fair-share count, or identical requests would alias a job that never runs.
+        print(f"Error: could not enqueue job {job_id}: {e}")
+        try:
+            if fingerprint: result_cache.release(username, fingerprint, job_id)
+            if route: scheduler.release(username, route["workload"])
+            job_manager.fail_job(job_id, f"Could not enqueue job: {e}")
+        except Exception as cleanup_error: print(f"Warning: cleanup after failed enqueue of {job_id} failed: {cleanup_error}")
+        raise
+    return {"job_id": job_id, "status": "queued", "queue": route["queue"], "priority": route["priority"]}
 
 @app.post("/generate/async")
 async def start_generation_job(request: GeneratorRequest, user: dict = Depends(get_current_user)):
-    job_id = str(uuid.uuid4())
-    job_manager.create_job(job_id, request.model_dump())
-    generate_dataset_task.delay(job_id, request.model_dump_json())
-    return {"job_id": job_id, "status": "queued"}
+    return await asyncio.to_thread(submit_generation_job, request, user.username)
 
 # TODO: Implement proper WebSocket authentication in production.
 @app.websocket("/ws/jobs/{job_id}")
@@ -131,6 +243,7 @@ async def websocket_job_status(websocket: WebSocket, job_id: str):
 @app.get("/jobs/{job_id}/result")
 def get_job_result(job_id: str, user: dict = Depends(get_current_user)):
     job = job_manager.get_job(job_id)
+    if job and not job_manager.can_access(job, user.username): raise HTTPException(status_code=404, detail="Job not found")
     if not job or job["status"] != "completed": raise HTTPException(status_code=400, detail="Job not ready")
     raw_data = job["data"]
     config_dict = job.get("config", {})
@@ -140,10 +253,20 @@ def get_job_result(job_id: str, user: dict = Depends(get_current_user)):
             self.output_format = d.get("output_format", "json")
             self.job_name = d.get("job_name", "dataset")
     config = ConfigShim(config_dict)
+    started = time.perf_counter()
     formatted_output = format_generation_output(raw_data, config)
+    job_manager.record_export(job_id, config.output_format, time.perf_counter() - started)
     if config.output_format == "json": return formatted_output
     else: return create_file_response(formatted_output, config)
 
+@app.get("/jobs/{job_id}/metrics")
+def get_job_metrics(job_id: str, user: dict = Depends(get_current_user)):
+    job = job_manager.get_job(job_id)
+    if not job or not job_manager.can_access(job, user.username): raise HTTPException(status_code=404, detail="Job not found")
+    metrics = job.get("metrics") or {}
+    exports = {k[len("export_seconds_"):]: float(v) for k, v in job.items() if k.startswith("export_seconds_")}
+    return {"job_id": job_id, "status": job.get("status"), "metrics": metrics, "export_seconds": exports}
+
 @app.post("/projects", response_model=ProjectSummary)
 def create_project(project: ProjectCreate, db: Session = Depends(get_db), user: dict = Depends(get_current_user)):
     schema_json = project.schema_data.model_dump()
@@ -173,6 +296,7 @@ def delete_project(project_id: int, db: Session = Depends(get_db), user: dict =
 
 @app.post("/connectors/test")
 def test_db_connection(payload: dict, user: dict = Depends(get_current_user)):
+    from db_connector import DatabaseConnector  # imports pandas, only needed by the connector endpoints
     conn_str = payload.get("connection_string")
     try: DatabaseConnector.test_connection(conn_str); return {"status": "success", "message": "OK"}
     except Exception as e: raise HTTPException(status_code=400, detail=str(e))
@@ -180,8 +304,10 @@ def test_db_connection(payload: dict, user: dict = Depends(get_current_user)):
 @app.post("/connectors/push")
 async def push_to_database(payload: PushToDbRequest, user: dict = Depends(get_current_user)):
     job = job_manager.get_job(payload.job_id)
+    if job and not job_manager.can_access(job, user.username): raise HTTPException(status_code=404, detail="Job not found")
     if not job or job["status"] != "completed": raise HTTPException(status_code=400, detail="Job not completed")
     raw_data = job["data"]
+    from db_connector import DatabaseConnector
     try:
         await asyncio.to_thread(DatabaseConnector.push_data, payload.connection_string, raw_data)
         return {"status": "success", "message": "Pushed"}
@@ -0,0 +1,128 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client import multiprocess
+
+# Time only every Nth field generation (counts stay exact, durations are scaled up). 1 = time every call.
+METRICS_SAMPLE_EVERY = max(1, int(os.getenv("METRICS_SAMPLE_EVERY", "1")))
+
+FIELD_SECONDS = Counter("datasynth_field_generation_seconds_total", "Estimated time spent generating field values", ["generator"])
+FIELD_VALUES = Counter("datasynth_field_values_total", "Generated field values", ["generator"])
+UNIQUE_RETRIES = Counter("datasynth_unique_retries_total", "Extra attempts needed to satisfy is_unique", ["generator"])
+ROWS_GENERATED = Counter("datasynth_rows_generated_total", "Generated rows")
+LLM_REQUESTS = Counter("datasynth_llm_requests_total", "LLM API requests", ["provider", "outcome"])
+LLM_TOKENS = Counter("datasynth_llm_tokens_total", "LLM tokens reported by the provider", ["provider", "kind"])
+LLM_LATENCY = Histogram("datasynth_llm_request_seconds", "LLM request latency", ["provider"], buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60))
+SYNC_REQUESTS = Counter("datasynth_sync_requests_total", "Synchronous /generate requests by outcome", ["outcome"])
+QUEUE_WAIT = Histogram("datasynth_queue_wait_seconds", "Time from job submission until a worker starts it", ["queue"], buckets=(0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600))
+STAGE_SECONDS = Histogram("datasynth_stage_seconds", "Time spent in generation, export, serialization and Redis calls", ["stage"], buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 30, 120, 600))
+
+# Collectors computed at scrape time (e.g. queue depths read from Redis).
+_EXTRA_COLLECTORS = []
+
+def register_collector(collector):
+    _EXTRA_COLLECTORS.append(collector)
+    if not os.getenv("PROMETHEUS_MULTIPROC_DIR"): REGISTRY.register(collector)
+
+def metrics_registry() -> CollectorRegistry:
+    # Celery prefork children write to PROMETHEUS_MULTIPROC_DIR; the exporter aggregates them.
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        for collector in _EXTRA_COLLECTORS: registry.register(collector)
+        return registry
+    return REGISTRY
+
+def render_metrics():
+    return generate_latest(metrics_registry()), CONTENT_TYPE_LATEST
+
+@contextmanager
+def observe_stage(stage: str, profiler: Optional["GenerationProfiler"] = None):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage=stage).observe(elapsed)
+        if profiler: profiler.record_stage(stage, elapsed)
+
+class GenerationProfiler:
+    """
+    Per-job timing of fields, generator types, uniqueness retries, LLM calls and stages.
+    The summary is stored with the job; publish() adds the per-generator totals to the Prometheus counters once per job.
+    """
+    def __init__(self, sample_every: int = METRICS_SAMPLE_EVERY):
+        self.sample_every = max(1, sample_every)
+        self.fields: Dict[tuple, list] = {}
+        self.llm: Dict[str, Dict[str, float]] = {}
+        self.stages: Dict[str, list] = {}
+        self.rows = 0
+        self._started = time.perf_counter()
+
+    def sample(self, table: str, field: str) -> bool:
+        # Every Nth value of each field, counted per field so no column is skipped whatever the field count.
+        # Counter based rather than random so sampling never touches the job RNG.
+        stats = self.fields.get((table, field))
+        return (stats[1] if stats else 0) % self.sample_every == 0
+
+    def record_field(self, table: str, field: str, generator: str, elapsed: Optional[float], retries: int = 0):
+        stats = self.fields.get((table, field))
+        if stats is None:
+            stats = self.fields[(table, field)] = [generator, 0, 0, 0.0, 0]
+        stats[1] += 1
+        if elapsed is not None:
+            stats[2] += 1
+            stats[3] += elapsed
+        stats[4] += retries
+
+    def record_llm(self, provider: str, latency: float, outcome: str = "success", prompt_tokens: int = 0, completion_tokens: int = 0):
+        stats = self.llm.setdefault(provider, {"requests": 0, "errors": 0, "prompt_tokens": 0, "completion_tokens": 0, "latency_seconds": 0.0})
+        stats["requests"] += 1
+        if outcome != "success": stats["errors"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        stats["latency_seconds"] += latency
+
+        LLM_REQUESTS.labels(provider=provider, outcome=outcome).inc()
+        LLM_LATENCY.labels(provider=provider).observe(latency)
+        if prompt_tokens: LLM_TOKENS.labels(provider=provider, kind="prompt").inc(prompt_tokens)
+        if completion_tokens: LLM_TOKENS.labels(provider=provider, kind="completion").inc(completion_tokens)
+
+    def record_stage(self, stage: str, elapsed: float):
+        stats = self.stages.setdefault(stage, [0, 0.0])
+        stats[0] += 1
+        stats[1] += elapsed
+
+    @staticmethod
+    def _estimate(calls: int, timed_calls: int, seconds: float) -> float:
+        return seconds * calls / timed_calls if timed_calls else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        fields, generators = {}, {}
+        for (table, field), (generator, calls, timed_calls, seconds, retries) in self.fields.items():
+            estimated = self._estimate(calls, timed_calls, seconds)
+            fields.setdefault(table, {})[field] = {"generator": generator, "values": calls, "seconds": round(estimated, 6), "unique_retries": retries}
+            totals = generators.setdefault(generator, {"values": 0, "seconds": 0.0, "unique_retries": 0})
+            totals["values"] += calls
+            totals["seconds"] += estimated
+            totals["unique_retries"] += retries
+        for totals in generators.values(): totals["seconds"] = round(totals["seconds"], 6)
+        return {
+            "sample_every": self.sample_every,
+            "rows": self.rows,
+            "wall_seconds": round(time.perf_counter() - self._started, 6),
+            "fields": fields,
+            "generators": generators,
+            "llm": {p: {k: round(v, 6) if isinstance(v, float) else v for k, v in s.items()} for p, s in self.llm.items()},
+            "stages": {stage: {"calls": calls, "seconds": round(seconds, 6)} for stage, (calls, seconds) in self.stages.items()},
+        }
+
+    def publish(self):
+        summary = self.to_dict()
+        ROWS_GENERATED.inc(self.rows)
+        for generator, totals in summary["generators"].items():
+            FIELD_VALUES.labels(generator=generator).inc(totals["values"])
+            FIELD_SECONDS.labels(generator=generator).inc(totals["seconds"])
+            if totals["unique_retries"]: UNIQUE_RETRIES.labels(generator=generator).inc(totals["unique_retries"])
@@ -22,6 +22,8 @@ class GeneratorConfig(BaseModel):
     global_context: Optional[str] = None
     output_format: Literal["json", "csv", "sql"] = "json"
     locale: str = Field("en_US", description="Locale for Faker (e.g., pl_PL, en_US)")
+    seed: Optional[int] = Field(None, description="Seed for reproducible output; seeded async jobs reuse identical earlier results")
+    priority: Optional[int] = Field(None, ge=0, le=9, description="Scheduling priority of async jobs, 0 = most urgent (default: per-user or 5)")
 
 class GeneratorRequest(BaseModel):
     config: GeneratorConfig
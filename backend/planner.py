@@ -0,0 +1,159 @@
+import array
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List
+from models import GeneratorRequest
+from columnar import ColumnarTable, DictionaryColumn, encode_tables
+from exporters import DataExporter
+from llm_providers import get_provider
+from metrics import GenerationProfiler
+from rate_limiter import estimate_tokens
+from engine import LLM_SYSTEM_MESSAGE, LLM_MAX_TOKENS
+
+# Rows per table generated by the dry run; estimates are scaled up from it.
+PLAN_SAMPLE_ROWS = int(os.getenv("PLAN_SAMPLE_ROWS", "200"))
+# LLM calls are not made during planning: assumed latency per call and length of a generated value.
+PLAN_LLM_LATENCY = float(os.getenv("PLAN_LLM_LATENCY", "1.5"))
+PLAN_LLM_VALUE_CHARS = int(os.getenv("PLAN_LLM_VALUE_CHARS", "80"))
+# Budgets reported by the plan (0 = unlimited).
+PLAN_MAX_SECONDS = float(os.getenv("PLAN_MAX_SECONDS", "0"))
+PLAN_MAX_LLM_TOKENS = int(os.getenv("PLAN_MAX_LLM_TOKENS", "0"))
+PLAN_MAX_MEMORY_MB = float(os.getenv("PLAN_MAX_MEMORY_MB", "0"))
+
+POINTER_BYTES = 8
+# Per value held in a unique column's tracker set while its table is generated (hash table slots at typical load).
+UNIQUE_TRACKER_BYTES = 48
+# Async jobs sleep 10 ms after every batch of 10 rows to let progress updates and cancellation through.
+WORKER_SECONDS_PER_ROW = 0.001
+
+def _column_bytes(column, rows: int, sample_rows: int) -> Dict[str, float]:
+    # (sealed, while-generating) size of a column scaled to `rows`; values shared between rows are counted once.
+    object_bytes = POINTER_BYTES * rows
+    if isinstance(column, array.array):
+        return {"sealed": column.itemsize * rows, "building": object_bytes + rows * sys.getsizeof(column[0] if len(column) else 0)}
+    if isinstance(column, DictionaryColumn):
+        return {"sealed": column.codes.itemsize * rows + sum(sys.getsizeof(v) for v in column.values), "building": object_bytes}
+    average = sum(sys.getsizeof(v) for v in column if v is not None) / max(1, sample_rows)
+    return {"sealed": object_bytes + average * rows, "building": object_bytes + average * rows}
+
+class JobPlanner:
+    """
+    Dry run of a GeneratorRequest: generation order, FK cycles and per-field time from a sampled run of the real
+    engine, LLM calls and tokens from prompt sizes, and memory/output sizes scaled up from the sample.
+    """
+    def __init__(self, engine, sample_rows: int = PLAN_SAMPLE_ROWS):
+        self.engine = engine
+        self.sample_rows = max(1, sample_rows)
+
+    def _sample_request(self, request: GeneratorRequest) -> GeneratorRequest:
+        # Same schema with fewer rows; LLM fields become fixed-length random strings so nothing leaves the process.
+        sample = request.model_copy(deep=True)
+        sample.config.seed = request.config.seed if request.config.seed is not None else 0
+        for table in sample.tables:
+            table.rows_count = min(table.rows_count, self.sample_rows)
+            for field in table.fields:
+                if field.type == "llm": field.type, field.params = "regex", {"pattern": f"[a-z ]{{{PLAN_LLM_VALUE_CHARS}}}"}
+        return sample
+
+    def _llm_field(self, table, field) -> Dict[str, Any]:
+        provider_name = field.params.get("provider", "openai")
+        try: provider = get_provider(provider_name)
+        except ValueError as e: return {"error": str(e)}
+        limits = provider.limits
+        prompt_tokens = estimate_tokens(LLM_SYSTEM_MESSAGE + field.params.get("prompt_template", ""))
+        # Calls within a job are sequential, so each one costs a round trip unless the rate limits are stricter.
+        seconds_per_call = PLAN_LLM_LATENCY
+        if limits.get("requests_per_minute"): seconds_per_call = max(seconds_per_call, 60 / limits["requests_per_minute"])
+        if limits.get("tokens_per_minute"): seconds_per_call = max(seconds_per_call, 60 * (prompt_tokens + LLM_MAX_TOKENS) / limits["tokens_per_minute"])
+        if provider.kind == "stub": seconds_per_call = provider.options.get("latency_ms", 0) / 1000
+        return {
+            "provider": provider_name,
+            "model": field.params.get("model") or provider.default_model,
+            "llm_calls": table.rows_count,
+            "prompt_tokens": prompt_tokens * table.rows_count,
+            "max_completion_tokens": LLM_MAX_TOKENS * table.rows_count,
+            "seconds": round(seconds_per_call * table.rows_count, 3),
+        }
+
+    async def plan(self, request: GeneratorRequest, sync_max_rows: int = 0) -> Dict[str, Any]:
+        id_to_name = {t.id: t.name for t in request.tables}
+        order = self.engine._resolve_generation_order(request.tables)
+        cycles = [[id_to_name[t_id] for t_id in cycle] for cycle in self.engine._find_dependency_cycles(request.tables)]
+
+        sample_request = self._sample_request(request)
+        profiler = GenerationProfiler(sample_every=1)
+        started = time.perf_counter()
+        sample = await self.engine.generate(sample_request, profiler=profiler)
+        sample_seconds = time.perf_counter() - started
+        sample_stats = profiler.to_dict()["fields"]
+        field_seconds = sum(f["seconds"] for t in sample_stats.values() for f in t.values())
+        sample_values = sum(f["values"] for t in sample_stats.values() for f in t.values()) or 1
+        # Engine time outside the field generators (row assembly, batching), spread over the values generated.
+        overhead_per_value = max(0.0, sample_seconds - field_seconds) / sample_values
+
+        total_rows = sum(t.rows_count for t in request.tables)
+        route = "worker" if sync_max_rows and total_rows > sync_max_rows else "sync"
+        totals = {"rows": total_rows, "seconds": 0.0, "llm_calls": 0, "prompt_tokens": 0, "max_completion_tokens": 0, "memory_bytes": 0, "peak_memory_bytes": 0, "output_bytes": {"json": 0, "csv": 0, "sql": 0}, "job_store_bytes": 0}
+        tables, largest_build = [], 0
+        for table in order:
+            sample_table: ColumnarTable = sample.get(table.name) or ColumnarTable([])
+            sample_rows = max(1, len(sample_table))
+            scale = table.rows_count / sample_rows
+            fields, table_seconds = [], 0.0
+            for field in table.fields:
+                stats = sample_stats.get(table.name, {}).get(field.name, {"seconds": 0.0, "values": 0, "unique_retries": 0})
+                entry = {"name": field.name, "generator": field.type, "values": table.rows_count}
+                if field.type == "llm": entry.update(self._llm_field(table, field))
+                else:
+                    entry["seconds"] = round((stats["seconds"] + stats["values"] * overhead_per_value) * scale, 3)
+                    entry["unique_retries"] = round(stats["unique_retries"] * scale)
+                for key in ("llm_calls", "prompt_tokens", "max_completion_tokens"): totals[key] += entry.get(key, 0)
+                table_seconds += entry.get("seconds", 0.0)
+                fields.append(entry)
+            if route == "worker": table_seconds += WORKER_SECONDS_PER_ROW * table.rows_count
+
+            sizes = [_column_bytes(sample_table.column(name), table.rows_count, sample_rows) for name in sample_table.columns]
+            memory = sum(s["sealed"] for s in sizes)
+            unique_fields = sum(1 for field in table.fields if field.is_unique)
+            largest_build = max(largest_build, sum(s["building"] for s in sizes) + unique_fields * UNIQUE_TRACKER_BYTES * table.rows_count - memory)
+            one_table = {table.name: sample_table}
+            output = {
+                "json": len(json.dumps(sample_table.to_rows(), default=str)) * scale,
+                "csv": len(DataExporter.to_csv_zip(one_table)) * scale,
+                "sql": len(DataExporter.to_sql(one_table)) * scale,
+            }
+            job_store = len(json.dumps(encode_tables(one_table), default=str)) * scale
+
+            totals["seconds"] += table_seconds
+            totals["memory_bytes"] += memory
+            totals["job_store_bytes"] += job_store
+            for fmt, size in output.items(): totals["output_bytes"][fmt] += size
+            tables.append({
+                "id": table.id, "name": table.name, "rows": table.rows_count, "seconds": round(table_seconds, 3),
+                "memory_bytes": int(memory), "output_bytes": {fmt: int(size) for fmt, size in output.items()}, "job_store_bytes": int(job_store),
+                "fields": fields,
+            })
+
+        totals["seconds"] = round(totals["seconds"], 3)
+        totals["peak_memory_bytes"] = int(totals["memory_bytes"] + largest_build)
+        totals["memory_bytes"] = int(totals["memory_bytes"])
+        totals["job_store_bytes"] = int(totals["job_store_bytes"])
+        totals["output_bytes"] = {fmt: int(size) for fmt, size in totals["output_bytes"].items()}
+        return {
+            "execution_order": [t.name for t in order],
+            "cycles": cycles,
+            "route": route,
+            "sample_rows": self.sample_rows,
+            "tables": tables,
+            "totals": totals,
+            "budget": self._check_budget(totals),
+        }
+
+    @staticmethod
+    def _check_budget(totals: Dict[str, Any]) -> Dict[str, Any]:
+        limits = {"seconds": PLAN_MAX_SECONDS, "llm_tokens": PLAN_MAX_LLM_TOKENS, "peak_memory_bytes": int(PLAN_MAX_MEMORY_MB * 1024 * 1024)}
+        usage = {"seconds": totals["seconds"], "llm_tokens": totals["prompt_tokens"] + totals["max_completion_tokens"], "peak_memory_bytes": totals["peak_memory_bytes"]}
+        violations: List[str] = [f"{key} {usage[key]} exceeds {limit}" for key, limit in limits.items() if limit and usage[key] > limit]
+        return {"limits": {k: v for k, v in limits.items() if v}, "within_budget": not violations, "violations": violations}
@@ -0,0 +1,157 @@
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "6"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "60"))
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+# Jitter must not come from the job RNG, otherwise retries would shift the generated data.
+_jitter = random.Random()
+
+class ProviderUnavailableError(Exception):
+    """Raised when an LLM provider keeps throttling or failing after all retries."""
+
+class ProviderRequestError(Exception):
+    """Raised when an LLM call cannot succeed by retrying (bad credentials, bad request, unknown model, no content)."""
+
+class TokenBucket:
+    def __init__(self, per_minute: int, burst_seconds: float = 10.0):
+        self.rate = per_minute / 60.0
+        self.capacity = max(1.0, self.rate * burst_seconds) if per_minute else 0.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float, now: float) -> float:
+        if not self.rate: return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount: return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount: float):
+        if self.rate: self.level -= min(amount, self.capacity)
+
+    def adjust(self, delta: float):
+        # Positive delta charges extra usage (may go into debt), negative refunds an over-estimate.
+        if self.rate: self.level = min(self.capacity, self.level - delta)
+
+class AdaptiveRateLimiter:
+    """
+    Token buckets on requests and tokens per minute plus an AIMD concurrency window:
+    the window grows by one per window of successful calls and halves on 429/5xx or slow responses.
+    Uses a thread lock and polling sleeps so it can be shared by jobs running on different event loops.
+    """
+    DECREASE_COOLDOWN = 1.0
+
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0, max_concurrency: int = 8, latency_target: float = 30.0, min_concurrency: int = 1):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(1, max_concurrency)
+        self.min_concurrency = max(1, min(min_concurrency, self.max_concurrency))
+        self.latency_target = latency_target
+        self.concurrency_limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    async def acquire(self, estimated_tokens: int = 0):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.in_flight >= int(self.concurrency_limit):
+                        wait = 0.05
+                    else:
+                        wait = max(self.requests.wait_time(1, now), self.tokens.wait_time(estimated_tokens, now))
+                        if wait <= 0:
+                            self.requests.take(1)
+                            self.tokens.take(estimated_tokens)
+                            self.in_flight += 1
+                            return
+            await asyncio.sleep(min(max(wait, 0.01), 1.0))
+
+    def _decrease(self, factor: float, now: float):
+        if now - self._last_decrease < self.DECREASE_COOLDOWN: return
+        self.concurrency_limit = max(float(self.min_concurrency), self.concurrency_limit * factor)
+        self._last_decrease = now
+
+    def record_success(self, latency: float, reserved_tokens: int = 0, used_tokens: Optional[int] = None):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            if used_tokens is not None: self.tokens.adjust(used_tokens - reserved_tokens)
+            if self.latency_target and latency > self.latency_target:
+                self._decrease(0.9, time.monotonic())
+            else:
+                self.concurrency_limit = min(float(self.max_concurrency), self.concurrency_limit + 1.0 / self.concurrency_limit)
+
+    def record_overload(self, retry_after: Optional[float] = None):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+            now = time.monotonic()
+            self._decrease(0.5, now)
+            if retry_after: self.blocked_until = max(self.blocked_until, now + retry_after)
+
+    def record_failure(self):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - 1)
+
+    def snapshot(self) -> Dict[str, float]:
+        with self._lock:
+            return {"concurrency_limit": round(self.concurrency_limit, 2), "in_flight": self.in_flight, "blocked_for": max(0.0, self.blocked_until - time.monotonic())}
+
+_limiters: Dict[str, AdaptiveRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider: str, limits: Optional[Dict[str, float]] = None) -> AdaptiveRateLimiter:
+    """Returns the process-wide limiter for a provider; limits (see llm_providers) apply on first use."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = AdaptiveRateLimiter(**(limits or {}))
+        return _limiters[provider]
+
+def estimate_tokens(text: str, max_tokens: int = 0) -> int:
+    return len(text) // 4 + 1 + max_tokens
+
+def parse_retry_after(headers) -> Optional[float]:
+    if not headers: return None
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try: return float(retry_after_ms) / 1000.0
+        except ValueError: pass
+    retry_after = headers.get("retry-after")
+    if not retry_after: return None
+    try: return max(0.0, float(retry_after))
+    except ValueError: pass
+    try: return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError): return None
+
+def classify_error(error: Exception):
+    """Returns (is_retryable, retry_after_seconds) for an exception raised by a provider client."""
+    import openai
+
+    if isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError, ConnectionError, TimeoutError)):
+        return True, None
+    status_code = getattr(error, "status_code", None)
+    if status_code in RETRYABLE_STATUS_CODES:
+        response = getattr(error, "response", None)
+        return True, parse_retry_after(getattr(response, "headers", None))
+    return False, None
+
+def backoff_delay(attempt: int, retry_after: Optional[float] = None) -> float:
+    # Full jitter exponential backoff; a server-provided Retry-After is a lower bound.
+    delay = _jitter.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * (2 ** attempt)))
+    if retry_after is not None: delay = max(delay, min(retry_after, LLM_BACKOFF_MAX))
+    return delay
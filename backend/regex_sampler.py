@@ -0,0 +1,224 @@
+import hashlib
+import random
+import re
+import string
+from functools import lru_cache
+from typing import List, Optional
+
+try:
+    import re._parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
+
+# Same conventions as rstr.xeger: '*', '+' and open-ended '{n,}' stop at 100 repeats, '.' and negated
+# classes draw from string.printable. Character sets are sorted so ranks do not depend on hash seeds.
+STAR_PLUS_LIMIT = 100
+PRINTABLE = string.printable
+WORD = string.ascii_letters + string.digits + "_"
+CATEGORIES = {
+    "CATEGORY_DIGIT": string.digits,
+    "CATEGORY_NOT_DIGIT": string.ascii_letters + string.punctuation,
+    "CATEGORY_SPACE": string.whitespace,
+    "CATEGORY_NOT_SPACE": PRINTABLE.strip(),
+    "CATEGORY_WORD": WORD,
+    "CATEGORY_NOT_WORD": "".join(set(PRINTABLE) - set(WORD)),
+}
+
+class UnsupportedPattern(ValueError):
+    """Raised for constructs that cannot be sampled independently (back-references, lookarounds)."""
+
+class _Chars:
+    fixed = True
+
+    def __init__(self, chars):
+        self.chars = "".join(sorted(set(chars)))
+        self.count = len(self.chars)
+        if not self.count: raise UnsupportedPattern("Empty character class")
+
+    def sample(self, rng): return self.chars[rng.randrange(self.count)]
+    def unrank(self, rank): return self.chars[rank]
+
+class _Seq:
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.fixed = all(n.fixed for n in nodes)
+        self.count = 1
+        for n in nodes: self.count *= n.count
+
+    def sample(self, rng): return "".join(n.sample(rng) for n in self.nodes)
+
+    def unrank(self, rank):
+        parts = []
+        for node in reversed(self.nodes):
+            rank, digit = divmod(rank, node.count)
+            parts.append(node.unrank(digit))
+        return "".join(reversed(parts))
+
+class _Alt:
+    fixed = False
+
+    def __init__(self, options):
+        self.options = options
+        self.count = sum(o.count for o in options)
+
+    def sample(self, rng): return self.options[rng.randrange(len(self.options))].sample(rng)
+
+    def unrank(self, rank):
+        for option in self.options:
+            if rank < option.count: return option.unrank(rank)
+            rank -= option.count
+        raise IndexError("rank out of range")
+
+class _Repeat:
+    def __init__(self, node, min_count, max_count):
+        self.node = node
+        self.min_count = min_count
+        self.max_count = max(min_count, min(max_count, STAR_PLUS_LIMIT))
+        self.fixed = node.fixed and self.min_count == self.max_count
+        self.counts = [node.count ** k for k in range(self.min_count, self.max_count + 1)]
+        self.count = sum(self.counts)
+
+    def sample(self, rng):
+        k = rng.randint(self.min_count, self.max_count)
+        if isinstance(self.node, _Chars): return "".join(rng.choices(self.node.chars, k=k))
+        return "".join(self.node.sample(rng) for _ in range(k))
+
+    def unrank(self, rank):
+        k = self.min_count
+        for count in self.counts:
+            if rank < count: break
+            rank -= count
+            k += 1
+        parts = []
+        for _ in range(k):
+            rank, digit = divmod(rank, self.node.count)
+            parts.append(self.node.unrank(digit))
+        return "".join(reversed(parts))
+
+def _compile_in(items):
+    chars, negate = [], False
+    for op, av in items:
+        name = op.name
+        if name == "NEGATE": negate = True
+        elif name == "LITERAL": chars.append(chr(av))
+        elif name == "RANGE": chars.extend(chr(c) for c in range(av[0], av[1] + 1))
+        elif name == "CATEGORY": chars.extend(CATEGORIES[av.name])
+        else: raise UnsupportedPattern(f"Unsupported class item {name}")
+    if negate: return _Chars(set(PRINTABLE) - set(chars))
+    return _Chars(chars)
+
+def _compile(parsed):
+    nodes = []
+    for op, av in parsed:
+        name = op.name
+        if name == "LITERAL": nodes.append(_Chars(chr(av)))
+        elif name == "NOT_LITERAL": nodes.append(_Chars(PRINTABLE.replace(chr(av), "")))
+        elif name == "ANY": nodes.append(_Chars(PRINTABLE.replace("\n", "")))
+        elif name == "IN": nodes.append(_compile_in(av))
+        elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"): nodes.append(_Repeat(_compile(av[2]), av[0], av[1]))
+        elif name == "SUBPATTERN": nodes.append(_compile(av[3]))
+        elif name == "ATOMIC_GROUP": nodes.append(_compile(av))
+        elif name == "BRANCH": nodes.append(_Alt([_compile(option) for option in av[1]]))
+        elif name == "AT": continue
+        else: raise UnsupportedPattern(f"Unsupported regex construct {name}")
+    return nodes[0] if len(nodes) == 1 else _Seq(nodes)
+
+MASK_64 = (1 << 64) - 1
+
+def _mix64(value: int) -> int:
+    # splitmix64 finalizer
+    value = ((value ^ (value >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    value = ((value ^ (value >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return value ^ (value >> 31)
+
+class _Permutation:
+    """
+    Keyed Feistel network over [0, domain) with cycle walking: a random permutation with O(1) state.
+    The halves may differ by a bit so the cipher covers less than 2 * domain and walks stay short.
+    """
+    ROUNDS = 4
+
+    def __init__(self, domain: int, key: int):
+        self.domain = domain
+        self.key = key
+        bits = max(2, (domain - 1).bit_length())
+        self.left_bits = bits // 2
+        self.right_bits = bits - self.left_bits
+        self.round_keys = [_mix64((key + round_no * 0x9E3779B97F4A7C15) & MASK_64) for round_no in range(self.ROUNDS)]
+
+    def _round(self, round_no: int, value: int, bits: int) -> int:
+        if self.right_bits <= 64: return _mix64(value ^ self.round_keys[round_no]) & ((1 << bits) - 1)
+        size = (bits + 7) // 8
+        data = f"{self.key}:{round_no}:{value}".encode()
+        digest = hashlib.blake2b(data, digest_size=size).digest() if size <= 64 else hashlib.shake_256(data).digest(size)
+        return int.from_bytes(digest, "big") & ((1 << bits) - 1)
+
+    def _encrypt(self, value: int) -> int:
+        left_bits, right_bits = self.left_bits, self.right_bits
+        left, right = value >> right_bits, value & ((1 << right_bits) - 1)
+        for round_no in range(self.ROUNDS):
+            left, right = right, left ^ self._round(round_no, right, left_bits)
+            left_bits, right_bits = right_bits, left_bits
+        return (left << right_bits) | right
+
+    def __getitem__(self, index: int) -> int:
+        value = self._encrypt(index)
+        while value >= self.domain: value = self._encrypt(value)
+        return value
+
+class UniqueRegexStream:
+    """Yields distinct strings of a pattern in a keyed random order; (key, index) is all the state there is."""
+    def __init__(self, sampler: "RegexSampler", key: int, index: int = 0):
+        self.sampler = sampler
+        self.key = key
+        self.index = index
+        self._permutation = _Permutation(sampler.domain_size, key)
+
+    def next(self) -> Optional[str]:
+        if self.index >= self.sampler.domain_size: return None
+        value = self.sampler.unrank(self._permutation[self.index])
+        self.index += 1
+        return value
+
+    def state(self) -> List[int]:
+        return [self.key, self.index]
+
+class RegexSampler:
+    """
+    A regex parsed once into a sampling tree. sample() mirrors rstr.xeger (uniform repeat counts and branches);
+    domain_size counts the distinct strings and unrank() maps 0..domain_size-1 onto them, which unique_stream()
+    walks in a random order. When is_uniform is true, sample() is already uniform over the domain, so the two agree.
+    Ranks map to distinct strings unless branches or repeats are ambiguous (e.g. "a|a"); callers still de-duplicate.
+    """
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self._root = _compile(sre_parse.parse(pattern).data)
+        self.domain_size = self._root.count
+        self.is_uniform = self._root.fixed
+
+    def sample(self, rng=random) -> str:
+        return self._root.sample(rng)
+
+    def unrank(self, rank: int) -> str:
+        return self._root.unrank(rank)
+
+    def unique_stream(self, rng=random, state: Optional[List[int]] = None) -> UniqueRegexStream:
+        if state: return UniqueRegexStream(self, state[0], state[1])
+        return UniqueRegexStream(self, rng.getrandbits(64))
+
+    def sample_many(self, n: int, rng=random, unique: bool = False) -> List[str]:
+        if not unique: return [self._root.sample(rng) for _ in range(n)]
+        stream, values, seen = self.unique_stream(rng), [], set()
+        while len(values) < n:
+            value = stream.next()
+            if value is None: raise ValueError(f"Pattern '{self.pattern}' has fewer than {n} distinct values")
+            if value not in seen:
+                seen.add(value)
+                values.append(value)
+        return values
+
+@lru_cache(maxsize=256)
+def compile_regex(pattern: str) -> Optional[RegexSampler]:
+    """Cached RegexSampler for a pattern, or None when it is invalid or unsupported (callers fall back to rstr)."""
+    try: return RegexSampler(pattern)
+    except (re.error, UnsupportedPattern, RecursionError): return None
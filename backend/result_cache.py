@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import time
+from typing import Optional
+from job_manager import job_manager
+
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))
+RESULT_CACHE_MAX_ENTRIES = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "100"))
+INFLIGHT_TTL = int(os.getenv("RESULT_INFLIGHT_TTL", os.getenv("CELERY_VISIBILITY_TIMEOUT", "3600")))
+
+# Config keys that only affect how a job is scheduled or its result exported, not the generated rows.
+PRESENTATION_KEYS = ("job_name", "output_format", "priority")
+
+def request_fingerprint(request) -> Optional[str]:
+    """
+    Canonical hash of the parts of a GeneratorRequest that determine its rows, or None when the request is not
+    reproducible (no seed). LLM columns are included as-is: a seeded request reuses whatever the first run produced.
+    """
+    if request.config.seed is None: return None
+    payload = request.model_dump(mode="json")
+    for key in PRESENTATION_KEYS: payload["config"].pop(key, None)
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+class RedisResultCache:
+    """
+    Maps (user, request fingerprint) to the job holding its rows. Entries expire after RESULT_CACHE_TTL and each user
+    keeps at most RESULT_CACHE_MAX_ENTRIES, oldest evicted first. A separate in-flight key lets identical submissions
+    attach to the job that is already generating instead of queueing another one.
+    """
+    def __init__(self, redis_client, ttl: int = RESULT_CACHE_TTL, max_entries: int = RESULT_CACHE_MAX_ENTRIES):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    def _result_key(self, owner, fingerprint): return f"result:{owner}:{fingerprint}"
+    def _inflight_key(self, owner, fingerprint): return f"inflight:{owner}:{fingerprint}"
+    def _index_key(self, owner): return f"result_index:{owner}"
+
+    def lookup(self, owner: str, fingerprint: str) -> Optional[str]:
+        if not self.enabled: return None
+        job_id = self.redis.get(self._result_key(owner, fingerprint))
+        if not job_id: return None
+        if job_manager.get_status(job_id) != "completed":
+            self.redis.delete(self._result_key(owner, fingerprint))
+            return None
+        return job_id
+
+    def claim(self, owner: str, fingerprint: str, job_id: str) -> Optional[str]:
+        """Registers job_id as the in-flight job; returns the existing in-flight job id if another one got there first."""
+        if not self.enabled: return None
+        key = self._inflight_key(owner, fingerprint)
+        if self.redis.set(key, job_id, nx=True, ex=INFLIGHT_TTL): return None
+        leader = self.redis.get(key)
+        if leader and leader != job_id: return leader
+        return None
+
+    def store(self, owner: str, fingerprint: str, job_id: str):
+        if not self.enabled: return
+        result_key, index_key = self._result_key(owner, fingerprint), self._index_key(owner)
+        pipe = self.redis.pipeline()
+        pipe.set(result_key, job_id, ex=self.ttl)
+        pipe.zadd(index_key, {result_key: time.time()})
+        pipe.expire(index_key, self.ttl)
+        pipe.delete(self._inflight_key(owner, fingerprint))
+        pipe.execute()
+
+        evicted = self.redis.zrange(index_key, 0, -(self.max_entries + 1))
+        if evicted:
+            self.redis.delete(*evicted)
+            self.redis.zrem(index_key, *evicted)
+
+    def release(self, owner: str, fingerprint: str, job_id: str):
+        key = self._inflight_key(owner, fingerprint)
+        if self.redis.get(key) == job_id: self.redis.delete(key)
+
+result_cache = RedisResultCache(job_manager.redis)
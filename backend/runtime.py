@@ -0,0 +1,71 @@
+import asyncio
+import os
+import threading
+from typing import Dict, List
+from faker import Faker
+
+# Locales pre-built when a worker starts; others are built on first use and then kept.
+WARM_LOCALES = [l.strip() for l in os.getenv("WARM_LOCALES", "en_US").split(",") if l.strip()]
+FAKER_POOL_SIZE = int(os.getenv("FAKER_POOL_SIZE", "4"))
+
+class FakerPool:
+    """
+    Idle Faker instances per locale. Building Faker(locale) loads every provider and costs far more than a small job,
+    so instances are checked out per job (each job rebinds .random to its own RNG) and returned afterwards.
+    """
+    def __init__(self, max_idle: int = FAKER_POOL_SIZE):
+        self.max_idle = max_idle
+        self._idle: Dict[str, List[Faker]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, locale: str) -> Faker:
+        with self._lock:
+            idle = self._idle.get(locale)
+            if idle: return idle.pop()
+        try: return Faker(locale)
+        except Exception:
+            if locale == "en_US": raise
+            return self.acquire("en_US")
+
+    def release(self, faker: Faker):
+        locale = faker.locales[0]
+        with self._lock:
+            idle = self._idle.setdefault(locale, [])
+            if len(idle) < self.max_idle: idle.append(faker)
+
+    def warm(self, locales: List[str]):
+        for locale in locales: self.release(self.acquire(locale))
+
+class WorkerRuntime:
+    """Per-process state kept warm across tasks: the DataEngine, Faker instances and an event loop per thread."""
+    def __init__(self):
+        self.faker_pool = FakerPool()
+        self._engine = None
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def get_engine(self):
+        with self._lock:
+            if self._engine is None:
+                from engine import DataEngine
+                self._engine = DataEngine()
+            return self._engine
+
+    def run(self, coroutine):
+        # One loop per thread, so per-loop LLM clients (and their connection pools) survive between tasks. Prefork
+        # children have a single thread; the threads pool used for LLM jobs runs several tasks at once.
+        loop = getattr(self._local, "loop", None)
+        if loop is None or loop.is_closed():
+            loop = self._local.loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+        return loop.run_until_complete(coroutine)
+
+    def warm_up(self, locales: List[str] = None):
+        self.get_engine()
+        self.faker_pool.warm(locales or WARM_LOCALES)
+
+    def reset_after_fork(self):
+        # Event loops must not be shared with the parent process; everything else is fork-safe.
+        self._local = threading.local()
+
+runtime = WorkerRuntime()
@@ -0,0 +1,83 @@
+import json
+import os
+from typing import Any, Dict, List
+from prometheus_client.core import GaugeMetricFamily
+from celery_worker import LLM_QUEUE, CPU_QUEUE, PRIORITY_LEVELS, PRIORITY_SEP
+from job_manager import job_manager
+
+QUEUES = {"llm": LLM_QUEUE, "cpu": CPU_QUEUE}
+DEFAULT_PRIORITY = int(os.getenv("DEFAULT_JOB_PRIORITY", "5"))
+# Default priority per user when a request does not set one, e.g. USER_PRIORITIES='{"ci": 7, "analyst": 3}'.
+USER_PRIORITIES: Dict[str, int] = json.loads(os.getenv("USER_PRIORITIES", "{}"))
+# Each queued or running job of the same user and class pushes the next one down a level, up to this many levels.
+FAIR_SHARE_MAX_PENALTY = int(os.getenv("FAIR_SHARE_MAX_PENALTY", "4"))
+# Jobs with at most this many rows move up a level, so fixtures are not stuck behind bulk jobs of the same class.
+SMALL_JOB_ROWS = int(os.getenv("SMALL_JOB_ROWS", "1000"))
+ACTIVE_TTL = int(os.getenv("CELERY_VISIBILITY_TIMEOUT", "3600"))
+
+def classify_workload(request) -> str:
+    """'llm' when any field calls a model (the job mostly waits on the network), otherwise 'cpu'."""
+    return "llm" if any(field.type == "llm" for table in request.tables for field in table.fields) else "cpu"
+
+def priority_queue_names(queue: str) -> List[str]:
+    # Redis lists kombu uses for one queue: priority 0 keeps the plain name.
+    return [queue] + [f"{queue}{PRIORITY_SEP}{level}" for level in range(1, PRIORITY_LEVELS)]
+
+class FairShareScheduler:
+    """
+    Picks the queue and broker priority of a generation job. Users keep a counter of their queued and running jobs per
+    workload class; every job already in flight lowers the priority of the next one, so one user's batch cannot hold a
+    queue while other users wait. Counters expire after the broker visibility timeout in case a release is lost.
+    """
+    def __init__(self, redis_client):
+        self.redis = redis_client
+
+    def _active_key(self, owner: str, workload: str): return f"sched:active:{workload}:{owner}"
+
+    def route(self, request, owner: str) -> Dict[str, Any]:
+        workload = classify_workload(request)
+        key = self._active_key(owner, workload)
+        pipe = self.redis.pipeline()
+        pipe.incr(key)
+        pipe.expire(key, ACTIVE_TTL)
+        active = pipe.execute()[0] - 1
+
+        priority = request.config.priority
+        if priority is None: priority = USER_PRIORITIES.get(owner, DEFAULT_PRIORITY)
+        priority += min(active, FAIR_SHARE_MAX_PENALTY)
+        if sum(table.rows_count for table in request.tables) <= SMALL_JOB_ROWS: priority -= 1
+        return {"workload": workload, "queue": QUEUES[workload], "priority": max(0, min(PRIORITY_LEVELS - 1, priority))}
+
+    def release(self, owner: str, workload: str, job_id: str = None):
+        # With a job id, a second release of the same job (e.g. a redelivered task) is a no-op.
+        if job_id and not self.redis.set(f"sched:released:{job_id}", 1, nx=True, ex=ACTIVE_TTL): return
+        key = self._active_key(owner, workload)
+        if self.redis.decr(key) <= 0: self.redis.delete(key)
+
+    def queue_depths(self) -> Dict[str, int]:
+        pipe = self.redis.pipeline()
+        for queue in QUEUES.values():
+            for name in priority_queue_names(queue): pipe.llen(name)
+        lengths = iter(pipe.execute())
+        return {queue: sum(next(lengths) for _ in range(PRIORITY_LEVELS)) for queue in QUEUES.values()}
+
+class QueueDepthCollector:
+    """Prometheus collector reading queue lengths from the broker at scrape time, for autoscaling the worker pools."""
+    def __init__(self, scheduler: FairShareScheduler):
+        self.scheduler = scheduler
+
+    def _gauge(self): return GaugeMetricFamily("datasynth_queue_depth", "Generation jobs waiting in each Celery queue", labels=["queue"])
+
+    # Without describe(), registering the collector calls collect() and so reaches Redis at import time.
+    def describe(self): yield self._gauge()
+
+    def collect(self):
+        gauge = self._gauge()
+        try: depths = self.scheduler.queue_depths()
+        except Exception as e:
+            print(f"Warning: queue depth unavailable: {e}")
+            depths = {}
+        for queue, depth in depths.items(): gauge.add_metric([queue], depth)
+        yield gauge
+
+scheduler = FairShareScheduler(job_manager.redis)
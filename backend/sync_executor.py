@@ -0,0 +1,74 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from runtime import runtime
+
+# Threads running synchronous /generate requests, and how many more may wait for one before callers get a 429.
+SYNC_WORKERS = int(os.getenv("SYNC_WORKERS", "2"))
+SYNC_QUEUE_LIMIT = int(os.getenv("SYNC_QUEUE_LIMIT", "8"))
+SYNC_RETRY_AFTER = int(os.getenv("SYNC_RETRY_AFTER", "5"))
+# Sync requests with more rows than this are generated by the Celery worker and streamed back. 0 = never.
+SYNC_MAX_ROWS = int(os.getenv("SYNC_MAX_ROWS", "10000"))
+SYNC_OFFLOAD_TIMEOUT = float(os.getenv("SYNC_OFFLOAD_TIMEOUT", "600"))
+# Offloaded sync requests waiting on a worker at once; beyond that callers get a 429.
+SYNC_OFFLOAD_LIMIT = int(os.getenv("SYNC_OFFLOAD_LIMIT", "16"))
+SYNC_POLL_INTERVAL = float(os.getenv("SYNC_POLL_INTERVAL", "0.5"))
+
+class ExecutorSaturated(Exception):
+    """Raised when every sync worker is busy and the wait queue is full."""
+
+class SyncExecutor:
+    """
+    Bounded thread pool for synchronous generation, so Faker/regex/template work and exports never run on the API
+    event loop. At most workers + queue_limit requests are admitted at a time; a slot is freed when the work finishes
+    (or is cancelled before starting), not when the client goes away. Each thread keeps its own event loop (see
+    WorkerRuntime.run), which keeps per-loop LLM clients alive between requests.
+    """
+    def __init__(self, workers: int = SYNC_WORKERS, queue_limit: int = SYNC_QUEUE_LIMIT):
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_limit)
+        self.admitted = 0
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="sync-generate")
+        self._lock = threading.Lock()
+
+    def _admit(self):
+        with self._lock:
+            if self.admitted >= self.capacity: raise ExecutorSaturated(f"Server busy: {self.admitted} generation requests in progress")
+            self.admitted += 1
+
+    def _release(self, _future=None):
+        with self._lock: self.admitted -= 1
+
+    async def submit(self, func, *args):
+        self._admit()
+        try: future = self._executor.submit(func, *args)
+        except Exception:
+            self._release()
+            raise
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def run_coroutine(self, coroutine):
+        # Called from a pool thread.
+        return runtime.run(coroutine)
+
+class AdmissionGate:
+    """Counts requests in progress and refuses new ones past capacity, like SyncExecutor without the threads."""
+    def __init__(self, capacity: int):
+        self.capacity = max(1, capacity)
+        self.admitted = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self):
+        with self._lock:
+            if self.admitted >= self.capacity: raise ExecutorSaturated(f"Server busy: {self.admitted} offloaded generation requests in progress")
+            self.admitted += 1
+        try: yield
+        finally:
+            with self._lock: self.admitted -= 1
+
+sync_executor = SyncExecutor()
+offload_gate = AdmissionGate(SYNC_OFFLOAD_LIMIT)
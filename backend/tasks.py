@@ -1,30 +1,88 @@
-import asyncio
 from celery_worker import celery_app
-from engine import DataEngine
+from celery.exceptions import Retry
+from runtime import runtime
 from models import GeneratorRequest
-from job_manager import job_manager
+from job_manager import job_manager, LeaseLostError, JOB_LEASE_TTL
 import json
+import redis
+import os
+import time
+import uuid
+from datetime import datetime
+from rate_limiter import ProviderUnavailableError
+from metrics import GenerationProfiler, observe_stage, QUEUE_WAIT
+from result_cache import result_cache
+from scheduling import scheduler
 
-@celery_app.task(bind=True, name="generate_dataset_task")
-def generate_dataset_task(self, job_id: str, request_json: str):
+# Failures worth another attempt: the retried task resumes from the job's last checkpoint instead of starting over.
+RETRYABLE_ERRORS = (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError, ConnectionError, TimeoutError, ProviderUnavailableError)
+# Runs of one job (first run, retries and redeliveries after a lost worker) before it is failed, so a job that keeps
+# killing its worker (e.g. OOM) is not requeued forever.
+JOB_MAX_RUNS = int(os.getenv("JOB_MAX_RUNS", "6"))
+
+@celery_app.task(bind=True, name="generate_dataset_task", acks_late=True, reject_on_worker_lost=True, max_retries=3)
+def generate_dataset_task(self, job_id: str, request_json: str, fingerprint: str = None, owner: str = None, workload: str = None):
+    # Unique per run: a message redelivered after the visibility timeout keeps its task id.
+    holder = f"{self.request.id}:{uuid.uuid4().hex}"
     try:
+        job = job_manager.get_job(job_id)
+        if job and job.get("status") == "completed":
+            # Redelivered after the result was already stored (e.g. the worker died before acking). The first run may
+            # not have got to caching the result or releasing its fair-share slot; both are safe to repeat.
+            if fingerprint: result_cache.store(owner, fingerprint, job_id)
+            if workload: scheduler.release(owner, workload, job_id)
+            return {"status": "success", "job_id": job_id}
+        if not job_manager.acquire_lease(job_id, holder):
+            # Another worker is still running this job; check again once its lease could have lapsed.
+            print(f"Job {job_id} is running elsewhere, retrying in {JOB_LEASE_TTL}s")
+            raise self.retry(countdown=JOB_LEASE_TTL, max_retries=None)
+        if job_manager.count_run(job_id) > JOB_MAX_RUNS: raise RuntimeError(f"Job gave up after {JOB_MAX_RUNS} runs")
+        if job and job.get("created_at") and not self.request.retries:
+            queue = (self.request.delivery_info or {}).get("routing_key") or "default"
+            QUEUE_WAIT.labels(queue=queue).observe(max(0.0, time.time() - datetime.fromisoformat(job["created_at"]).timestamp()))
+
         req_dict = json.loads(request_json)
         request = GeneratorRequest(**req_dict)
         
-        engine = DataEngine()
-        
-        loop = asyncio.get_event_loop()
-        if loop.is_closed():
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-        result = loop.run_until_complete(engine.generate(request, job_id))
+        engine = runtime.get_engine()
+
+        profiler = GenerationProfiler()
+        with observe_stage("generation", profiler):
+            result = runtime.run(engine.generate(request, job_id, profiler, holder))
         
-        job_manager.complete_job(job_id, result)
+        job_manager.complete_job(job_id, result, profiler)
+        profiler.publish()
+        job_manager.clear_checkpoint(job_id)
+        if fingerprint: result_cache.store(owner, fingerprint, job_id)
+        if workload: scheduler.release(owner, workload, job_id)
         
         return {"status": "success", "job_id": job_id}
 
+    except Retry: raise
+
+    except LeaseLostError as e:
+        # The job was taken over by another run, which completes it.
+        print(f"WORKER: stopping job {job_id}: {e}")
+        return {"status": "superseded", "job_id": job_id}
+
+    except RETRYABLE_ERRORS as e:
+        if self.request.retries < self.max_retries:
+            print(f"WORKER ERROR (retry {self.request.retries + 1}/{self.max_retries}): {e}")
+            raise self.retry(exc=e, countdown=2 ** self.request.retries)
+        print(f"CRITICAL WORKER ERROR: {e}")
+        job_manager.fail_job(job_id, str(e))
+        job_manager.clear_checkpoint(job_id)
+        if fingerprint: result_cache.release(owner, fingerprint, job_id)
+        if workload: scheduler.release(owner, workload, job_id)
+        raise e
+
     except Exception as e:
         print(f"CRITICAL WORKER ERROR: {e}")
         job_manager.fail_job(job_id, str(e))
-        raise e
\ No newline at end of file
+        job_manager.clear_checkpoint(job_id)
+        if fingerprint: result_cache.release(owner, fingerprint, job_id)
+        if workload: scheduler.release(owner, workload, job_id)
+        raise e
+
+    finally:
+        job_manager.release_lease(job_id, holder)
@@ -51,4 +51,116 @@ def test_user(db_session):
 @pytest.fixture(scope="function")
 def auth_headers(test_user):
     token = create_access_token(data={"sub": test_user.username})
-    return {"Authorization": f"Bearer {token}"}
\ No newline at end of file
+    return {"Authorization": f"Bearer {token}"}
+
+class FakeRedis:
+    """Just enough of redis-py (decode_responses=True) for the job store, result cache and scheduler. Expiry is ignored."""
+    def __init__(self):
+        self.values, self.hashes, self.zsets, self.lists, self.sets, self._queued = {}, {}, {}, {}, {}, None
+
+    def pipeline(self):
+        pipe = FakeRedis.__new__(FakeRedis)
+        pipe.values, pipe.hashes, pipe.zsets, pipe.lists, pipe.sets, pipe._queued = self.values, self.hashes, self.zsets, self.lists, self.sets, []
+        return pipe
+
+    def _run(self, func, *args):
+        if self._queued is None: return func(*args)
+        self._queued.append((func, args))
+        return self
+
+    def execute(self):
+        results = [func(*args) for func, args in self._queued]
+        self._queued = []
+        return results
+
+    # Pipelines: watch() switches to immediate mode like redis-py, multi() starts queueing again.
+    def __enter__(self): return self
+    def __exit__(self, *exc): self._queued = None
+    def watch(self, *keys): self._queued = None
+    def multi(self): self._queued = []
+
+    def _incrby(self, key, amount):
+        self.values[key] = int(self.values.get(key, 0)) + amount
+        return self.values[key]
+
+    def _set(self, key, value, nx):
+        if nx and key in self.values: return None
+        self.values[key] = str(value)
+        return True
+
+    def _delete(self, keys):
+        return sum(any(store.pop(key, None) is not None for store in (self.values, self.hashes, self.zsets, self.lists, self.sets)) for key in keys)
+
+    def _rpush(self, key, values):
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    def _hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        return int(fields[field])
+
+    def _zrange(self, key, start, stop):
+        members = [m for m, _ in sorted(self.zsets.get(key, {}).items(), key=lambda item: item[1])]
+        stop = stop + 1 if stop >= 0 else max(0, len(members) + stop + 1)
+        return members[start:stop]
+
+    def get(self, key): return self._run(lambda: self.values.get(key) if key in self.values else None)
+    def set(self, key, value, nx=False, ex=None): return self._run(self._set, key, value, nx)
+    def incr(self, key): return self._run(self._incrby, key, 1)
+    def decr(self, key): return self._run(self._incrby, key, -1)
+    def expire(self, key, seconds, gt=False): return self._run(lambda: True)
+    def delete(self, *keys): return self._run(self._delete, keys)
+    def llen(self, key): return self._run(lambda: len(self.lists.get(key, [])))
+    def zadd(self, key, mapping): return self._run(lambda: self.zsets.setdefault(key, {}).update(mapping))
+    def zrange(self, key, start, stop): return self._run(self._zrange, key, start, stop)
+    def zrem(self, key, *members): return self._run(lambda: sum(self.zsets.get(key, {}).pop(m, None) is not None for m in members))
+    def hgetall(self, key): return self._run(lambda: dict(self.hashes.get(key, {})))
+    def hget(self, key, field): return self._run(lambda: self.hashes.get(key, {}).get(field))
+    def hincrby(self, key, field, amount=1): return self._run(self._hincrby, key, field, amount)
+    def rpush(self, key, *values): return self._run(self._rpush, key, values)
+    def lrange(self, key, start, stop): return self._run(lambda: self.lists.get(key, [])[start:None if stop == -1 else stop + 1])
+    def sadd(self, key, *members): return self._run(lambda: self.sets.setdefault(key, set()).update(members))
+    def smembers(self, key): return self._run(lambda: set(self.sets.get(key, set())))
+    def hmget(self, key, fields): return self._run(lambda: [self.hashes.get(key, {}).get(f) for f in fields])
+
+    def hset(self, name, key=None, value=None, mapping=None):
+        fields = dict(mapping or {})
+        if key is not None: fields[key] = value
+        return self._run(lambda: self.hashes.setdefault(name, {}).update({k: str(v) for k, v in fields.items()}))
+
+@pytest.fixture(scope="function")
+def fake_redis():
+    return FakeRedis()
+
+@pytest.fixture(scope="function")
+def fake_scheduler(monkeypatch, fake_redis):
+    import main
+    from scheduling import FairShareScheduler
+    scheduler = FairShareScheduler(fake_redis)
+    monkeypatch.setattr(main, "scheduler", scheduler)
+    return scheduler
+
+class FakeTask:
+    """Stands in for generate_dataset_task; records (args, options) of each apply_async call."""
+    def __init__(self): self.calls = []
+    def apply_async(self, args, **options): self.calls.append((tuple(args), options))
+
+@pytest.fixture(scope="function")
+def fake_task(monkeypatch):
+    import main
+    task = FakeTask()
+    monkeypatch.setattr(main, "generate_dataset_task", task)
+    return task
+
+@pytest.fixture(scope="function")
+def build_payload():
+    """Factory for a one-table GeneratorRequest payload; extra keyword arguments go into config."""
+    def build(rows_count=5, fields=None, **config):
+        return {
+            "config": {"job_name": "Test Job", **config},
+            "tables": [{"id": "t1", "name": "users", "rows_count": rows_count, "fields": fields or [
+                {"name": "age", "type": "integer", "params": {"min": 18, "max": 99}}
+            ]}]
+        }
+    return build
@@ -55,4 +55,16 @@ def test_generate_sync(client, auth_headers):
     data = response.json()
     assert data["status"] == "success"
     assert data["total_rows"] == 5
-    assert len(data["data"]["users"]) == 5
\ No newline at end of file
+    assert len(data["data"]["users"]) == 5
+
+def test_metrics_endpoint(client, auth_headers):
+    payload = {
+        "config": {"job_name": "Metrics Job", "output_format": "csv"},
+        "tables": [{"id": "t1", "name": "users", "rows_count": 3, "fields": [{"name": "age", "type": "integer", "params": {"min": 18, "max": 99}}]}]
+    }
+    assert client.post("/generate", json=payload, headers=auth_headers).status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert 'datasynth_field_values_total{generator="integer"}' in response.text
+    assert 'datasynth_stage_seconds_count{stage="export_csv"}' in response.text
@@ -0,0 +1,45 @@
+import array
+import io
+import json
+import zipfile
+from columnar import ColumnarTable, DictionaryColumn, decode_tables, encode_tables
+from exporters import DataExporter
+
+ROWS = [{"id": i, "score": i * 0.5, "plan": "pro" if i % 3 else "free", "active": i % 2 == 0, "note": f"n{i}" if i % 4 else None} for i in range(12)]
+
+def test_columns_are_compacted():
+    table = ColumnarTable.from_rows(ROWS)
+
+    assert isinstance(table.column("id"), array.array) and isinstance(table.column("score"), array.array)
+    assert isinstance(table.column("plan"), DictionaryColumn) and isinstance(table.column("active"), DictionaryColumn)
+    assert table.column("note")[1] == "n1" and table.column("note")[0] is None
+    assert table == ROWS and table[-1]["plan"] == "pro" and dict(table[0]) == ROWS[0]
+
+def test_equal_values_of_different_types_are_not_merged():
+    table = ColumnarTable.from_rows([{"flag": value} for value in [1, True, 1.0, 1, True, 1.0]])
+    assert [type(row["flag"]) for row in table] == [int, bool, float] * 2
+
+def test_json_roundtrip_keeps_encoding():
+    tables = {"users": ColumnarTable.from_rows(ROWS)}
+    decoded = decode_tables(json.loads(json.dumps(encode_tables(tables))))
+
+    assert decoded == tables
+    assert isinstance(decoded["users"].column("plan"), DictionaryColumn)
+    assert decode_tables({"legacy": ROWS})["legacy"] == ROWS
+
+def test_checkpoint_chunks_join_into_appendable_table():
+    table = ColumnarTable.from_rows(ROWS)
+    chunks = [json.loads(json.dumps(table.to_json_dict(start, start + 5))) for start in range(0, len(table), 5)]
+    joined = ColumnarTable.from_chunks(chunks)
+    joined.append({"id": 99})
+
+    assert joined.to_rows(0, len(ROWS)) == ROWS
+    assert joined[-1]["id"] == 99 and joined[-1]["plan"] is None
+
+def test_exporters_accept_tables_and_rows():
+    table = ColumnarTable.from_rows(ROWS)
+    assert DataExporter.to_sql({"users": table}) == DataExporter.to_sql({"users": ROWS})
+
+    with zipfile.ZipFile(io.BytesIO(DataExporter.to_csv_zip({"users": table}))) as archive:
+        lines = archive.read("users.csv").decode().splitlines()
+    assert lines[0] == "id,score,plan,active,note" and lines[1] == "0,0.0,free,True,"
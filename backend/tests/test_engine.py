@@ -0,0 +1,167 @@
+import asyncio
+import copy
+import json
+import pytest
+import engine as engine_module
+import llm_providers
+from engine import DataEngine, AvoidSet
+from models import GeneratorRequest
+from metrics import GenerationProfiler
+from runtime import FakerPool
+from columnar import ColumnarTable
+
+class InMemoryJobManager:
+    def __init__(self, checkpoint=None):
+        self.checkpoint = copy.deepcopy(checkpoint)
+        self.snapshots = []
+
+    def set_total(self, job_id, total): pass
+    def update_progress(self, job_id, progress): pass
+    async def check_cancellation(self, job_id): pass
+
+    def load_checkpoint(self, job_id):
+        if self.checkpoint is None: return None
+        rows = {table_id: ColumnarTable.from_chunks(chunks) for table_id, chunks in self.checkpoint["rows"].items()}
+        return {"state": copy.deepcopy(self.checkpoint["state"]), "rows": rows}
+
+    def save_checkpoint(self, job_id, table_id, rows_chunk, state, lease=None):
+        if self.checkpoint is None: self.checkpoint = {"state": None, "rows": {}}
+        self.checkpoint["rows"].setdefault(table_id, []).append(json.loads(json.dumps(rows_chunk)))
+        self.checkpoint["state"] = json.loads(json.dumps(state))
+        self.snapshots.append(copy.deepcopy(self.checkpoint))
+
+def build_request():
+    return GeneratorRequest(**{
+        "config": {"job_name": "Checkpoint Job", "locale": "en_US"},
+        "tables": [
+            {"id": "t1", "name": "users", "rows_count": 40, "fields": [
+                {"name": "id", "type": "integer", "params": {"min": 1, "max": 100000}, "is_unique": True},
+                {"name": "name", "type": "faker", "params": {"method": "name"}},
+                {"name": "code", "type": "regex", "params": {"pattern": r"[A-Z]{3}-\d{3}"}, "is_unique": True}
+            ]},
+            {"id": "t2", "name": "orders", "rows_count": 30, "fields": [
+                {"name": "user_id", "type": "foreign_key", "params": {"table_id": "t1", "column_name": "id"}},
+                {"name": "status", "type": "distribution", "params": {"options": ["new", "paid"], "weights": [1, 3]}}
+            ]}
+        ]
+    })
+
+@pytest.fixture
+def checkpoint_every_20_rows(monkeypatch):
+    monkeypatch.setattr(engine_module, "CHECKPOINT_EVERY_ROWS", 20)
+
+def test_generate_writes_checkpoints(monkeypatch, checkpoint_every_20_rows):
+    manager = InMemoryJobManager()
+    monkeypatch.setattr(engine_module, "job_manager", manager)
+
+    result = asyncio.run(DataEngine().generate(build_request(), job_id="job-1"))
+
+    assert len(result["users"]) == 40 and len(result["orders"]) == 30
+    assert manager.checkpoint["state"]["completed_tables"] == ["t1", "t2"]
+    assert ColumnarTable.from_chunks(manager.checkpoint["rows"]["t1"]) == result["users"]
+
+def test_generate_resumes_from_checkpoint(monkeypatch, checkpoint_every_20_rows):
+    manager = InMemoryJobManager()
+    monkeypatch.setattr(engine_module, "job_manager", manager)
+    uninterrupted = asyncio.run(DataEngine().generate(build_request(), job_id="job-1"))
+
+    mid_table = next(s for s in manager.snapshots if s["state"]["table_id"] == "t1")
+    assert mid_table["state"]["rows_done"] == 20
+
+    monkeypatch.setattr(engine_module, "job_manager", InMemoryJobManager(mid_table))
+    resumed = asyncio.run(DataEngine().generate(build_request(), job_id="job-1"))
+
+    assert resumed == uninterrupted
+    assert len({row["id"] for row in resumed["users"]}) == 40
+    assert "unique_tracker" not in mid_table["state"]
+
+def test_unique_tracker_is_rebuilt_from_rows():
+    table = ColumnarTable.from_rows([{"id": 1, "code": "A"}, {"id": "Error: Uniqueness failed for id", "code": "B"}, {"id": 3, "code": "A"}])
+    tracker = {"id": set()}
+    DataEngine()._rebuild_unique_tracker(table, tracker)
+    assert tracker == {"id": {1, 3}}
+
+def test_avoid_set_keeps_rejects_out_of_the_tracker():
+    taken = {1, 2}
+    avoid = AvoidSet(taken)
+    avoid.add(3)
+    avoid.add(1)
+
+    assert 3 in avoid and 1 in avoid and 4 not in avoid and len(avoid) == 3
+    assert taken == {1, 2} and avoid.rejected == {3}
+
+    parents = {"p": ColumnarTable.from_rows([{"id": i} for i in range(1, 5)])}
+    value, parent_row = DataEngine()._generate_foreign_key_value({"table_id": "p", "column_name": "id"}, parents, avoid)
+    assert value == 4 and parent_row["id"] == 4
+
+def test_unique_columns_and_foreign_keys_stay_unique():
+    request = GeneratorRequest(**{
+        "config": {"job_name": "Unique Job", "seed": 3},
+        "tables": [
+            {"id": "p", "name": "parents", "rows_count": 15, "fields": [{"name": "id", "type": "integer", "params": {"min": 1, "max": 20}, "is_unique": True}]},
+            {"id": "c", "name": "children", "rows_count": 15, "fields": [{"name": "parent_id", "type": "foreign_key", "params": {"table_id": "p", "column_name": "id"}, "is_unique": True}]}
+        ]
+    })
+    result = asyncio.run(DataEngine().generate(request))
+
+    ids = [row["id"] for row in result["parents"]]
+    assert len(set(ids)) == 15 and all(isinstance(i, int) for i in ids)
+    assert sorted(row["parent_id"] for row in result["children"]) == sorted(ids)
+
+def test_stub_llm_provider_is_deterministic():
+    request = GeneratorRequest(**{
+        "config": {"job_name": "Stub Job"},
+        "tables": [{"id": "t1", "name": "products", "rows_count": 20, "fields": [
+            {"name": "name", "type": "template", "params": {"template": "Product {{ 1 }}"}},
+            {"name": "slogan", "type": "llm", "is_unique": True, "params": {"provider": "stub", "prompt_template": "Slogan for {name}"}}
+        ]}]
+    })
+
+    first = asyncio.run(DataEngine().generate(request))
+    second = asyncio.run(DataEngine().generate(request))
+
+    slogans = [row["slogan"] for row in first["products"]]
+    assert len(set(slogans)) == 20 and all(s.startswith("stub-") for s in slogans)
+    assert first == second
+
+def test_invalid_provider_config_is_skipped(monkeypatch, capsys):
+    monkeypatch.setattr(llm_providers, "_registry", {})
+    monkeypatch.setenv("LLM_PROVIDERS", '{"lmstudio": {"model": "qwen"}, "vllm": {"default_model": "qwen"}}')
+    llm_providers._load_registry()
+
+    assert "ignoring LLM provider 'lmstudio'" in capsys.readouterr().out
+    assert "lmstudio" not in llm_providers.list_providers()
+    assert llm_providers.get_provider("vllm").default_model == "qwen" and llm_providers.get_provider("stub")
+
+def test_generate_records_profile():
+    profiler = GenerationProfiler(sample_every=2)
+    asyncio.run(DataEngine().generate(build_request(), profiler=profiler))
+
+    summary = profiler.to_dict()
+    assert summary["rows"] == 70
+    assert summary["fields"]["users"]["id"]["values"] == 40
+    assert summary["generators"]["foreign_key"]["values"] == 30
+    assert summary["generators"]["faker"]["seconds"] > 0
+
+@pytest.mark.parametrize("sample_every", [2, 4])
+def test_profile_sampling_times_every_field(sample_every):
+    request = GeneratorRequest(**{
+        "config": {"job_name": "Sampled Job"},
+        "tables": [{"id": "t", "name": "t", "rows_count": 20, "fields": [
+            {"name": "a", "type": "faker", "params": {"method": "name"}},
+            {"name": "b", "type": "integer", "params": {"min": 1, "max": 9}}
+        ]}]
+    })
+    profiler = GenerationProfiler(sample_every=sample_every)
+    asyncio.run(DataEngine().generate(request, profiler=profiler))
+
+    fields = profiler.to_dict()["fields"]["t"]
+    assert fields["a"]["seconds"] > 0 and fields["b"]["seconds"] > 0
+
+def test_faker_pool_reuses_instances():
+    pool = FakerPool(max_idle=1)
+    faker = pool.acquire("pl_PL")
+    pool.release(faker)
+
+    assert pool.acquire("pl_PL") is faker
+    assert pool.acquire("xx_INVALID").locales == ["en_US"]
@@ -0,0 +1,49 @@
+import asyncio
+import planner as planner_module
+from engine import DataEngine, LLM_MAX_TOKENS
+from models import GeneratorRequest
+from planner import JobPlanner
+
+def plan_payload():
+    return {
+        "config": {"job_name": "Plan Job"},
+        "tables": [
+            {"id": "t2", "name": "orders", "rows_count": 1000, "fields": [
+                {"name": "user_id", "type": "foreign_key", "params": {"table_id": "t1", "column_name": "id"}},
+                {"name": "review", "type": "llm", "params": {"provider": "stub", "prompt_template": "Review order for {user_id}"}}
+            ]},
+            {"id": "t1", "name": "users", "rows_count": 500, "fields": [
+                {"name": "id", "type": "integer", "params": {"min": 1, "max": 10 ** 9}, "is_unique": True},
+                {"name": "plan", "type": "distribution", "params": {"options": ["free", "pro"]}}
+            ]},
+            {"id": "a", "name": "a", "rows_count": 5, "fields": [{"name": "b_id", "type": "foreign_key", "params": {"table_id": "b", "column_name": "b_id"}}]},
+            {"id": "b", "name": "b", "rows_count": 5, "fields": [{"name": "b_id", "type": "foreign_key", "params": {"table_id": "a", "column_name": "b_id"}}]},
+            {"id": "s", "name": "tree", "rows_count": 5, "fields": [{"name": "parent", "type": "foreign_key", "params": {"table_id": "s", "column_name": "parent"}}]}
+        ]
+    }
+
+def test_dependency_cycles_are_reported():
+    request = GeneratorRequest(**plan_payload())
+    assert DataEngine()._find_dependency_cycles(request.tables) == [["a", "b"], ["s"]]
+    order = [t.id for t in DataEngine()._resolve_generation_order(request.tables)]
+    assert order.index("t1") < order.index("t2") and order[-2:] == ["a", "b"]
+
+def test_plan_scales_sample_and_counts_llm_tokens(monkeypatch):
+    monkeypatch.setattr(planner_module, "PLAN_MAX_LLM_TOKENS", 1000)
+    plan = asyncio.run(JobPlanner(DataEngine(), sample_rows=50).plan(GeneratorRequest(**plan_payload()), sync_max_rows=100))
+
+    assert plan["execution_order"] == ["tree", "users", "orders", "a", "b"] and plan["cycles"] == [["a", "b"], ["tree"]]
+    assert plan["route"] == "worker"
+    review = next(f for f in plan["tables"][2]["fields"] if f["name"] == "review")
+    assert review["llm_calls"] == 1000 and review["max_completion_tokens"] == 1000 * LLM_MAX_TOKENS
+    assert plan["totals"]["prompt_tokens"] == review["prompt_tokens"] > 0
+
+    users = plan["tables"][1]
+    assert users["rows"] == 500 and users["memory_bytes"] > 500 * 8
+    assert plan["totals"]["output_bytes"]["sql"] > plan["totals"]["output_bytes"]["csv"] > 0
+    assert not plan["budget"]["within_budget"] and plan["budget"]["violations"][0].startswith("llm_tokens")
+
+def test_plan_endpoint(client, auth_headers):
+    response = client.post("/generate/plan", json=plan_payload(), headers=auth_headers)
+    assert response.status_code == 200
+    assert response.json()["totals"]["rows"] == 1515
@@ -0,0 +1,90 @@
+import asyncio
+import httpx
+import openai
+import pytest
+import engine as engine_module
+import rate_limiter
+from engine import DataEngine
+from llm_providers import get_provider
+from rate_limiter import AdaptiveRateLimiter, ProviderUnavailableError, ProviderRequestError, classify_error, parse_retry_after
+
+def rate_limit_error(retry_after="0"):
+    response = httpx.Response(429, headers={"retry-after": retry_after}, request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+    return openai.RateLimitError("Too Many Requests", response=response, body=None)
+
+class FakeResponse:
+    def __init__(self, content):
+        self.choices = [type("Choice", (), {"message": type("Message", (), {"content": content})()})()]
+        self.usage = type("Usage", (), {"total_tokens": 42})()
+
+class FakeAsyncOpenAI:
+    def __init__(self, outcomes):
+        self.outcomes = outcomes
+        self.chat = self
+        self.completions = self
+
+    async def create(self, **kwargs):
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception): raise outcome
+        return FakeResponse(outcome)
+
+@pytest.fixture
+def fresh_limiters(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    monkeypatch.setattr(rate_limiter, "LLM_BACKOFF_BASE", 0.01)
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after": "3"}) == 3.0
+    assert parse_retry_after({"retry-after-ms": "250", "retry-after": "3"}) == 0.25
+    assert parse_retry_after({}) is None
+    assert classify_error(rate_limit_error("7")) == (True, 7.0)
+    assert classify_error(ValueError("bad prompt")) == (False, None)
+
+def test_aimd_concurrency_window():
+    limiter = AdaptiveRateLimiter(max_concurrency=8)
+
+    asyncio.run(limiter.acquire())
+    limiter.record_overload(retry_after=0)
+    assert limiter.concurrency_limit == 4.0
+
+    for _ in range(8):
+        asyncio.run(limiter.acquire())
+        limiter.record_success(latency=0.1)
+    assert 5.0 < limiter.concurrency_limit <= 8.0
+    assert limiter.in_flight == 0
+
+def test_llm_value_retries_throttled_calls(monkeypatch, fresh_limiters):
+    outcomes = [rate_limit_error(), rate_limit_error(), "Acme Corp"]
+    monkeypatch.setattr(get_provider("openai"), "get_client", lambda: FakeAsyncOpenAI(outcomes))
+
+    value = asyncio.run(DataEngine()._generate_llm_value({"prompt_template": "Company name"}, {}))
+
+    assert value == "Acme Corp"
+    assert outcomes == []
+
+def test_llm_value_raises_when_retries_exhausted(monkeypatch, fresh_limiters):
+    monkeypatch.setattr(engine_module, "LLM_MAX_RETRIES", 1)
+    outcomes = [rate_limit_error(), rate_limit_error()]
+    monkeypatch.setattr(get_provider("openai"), "get_client", lambda: FakeAsyncOpenAI(outcomes))
+
+    with pytest.raises(ProviderUnavailableError):
+        asyncio.run(DataEngine()._generate_llm_value({"prompt_template": "Company name"}, {}))
+
+def test_llm_value_fails_job_on_non_retryable_errors(monkeypatch, fresh_limiters):
+    response = httpx.Response(401, request=httpx.Request("POST", "http://llm/v1/chat/completions"))
+    outcomes = [openai.AuthenticationError("Invalid API key", response=response, body=None)]
+    monkeypatch.setattr(get_provider("openai"), "get_client", lambda: FakeAsyncOpenAI(outcomes))
+
+    with pytest.raises(ProviderRequestError):
+        asyncio.run(DataEngine()._generate_llm_value({"prompt_template": "Company name"}, {}))
+    with pytest.raises(ProviderRequestError, match="Unknown LLM provider"):
+        asyncio.run(DataEngine()._generate_llm_value({"provider": "opneai", "prompt_template": "Company name"}, {}))
+
+def test_llm_value_retries_empty_content(monkeypatch, fresh_limiters):
+    monkeypatch.setattr(engine_module, "LLM_MAX_RETRIES", 1)
+    monkeypatch.setattr(get_provider("openai"), "get_client", lambda: FakeAsyncOpenAI([None, "Acme Corp"]))
+    assert asyncio.run(DataEngine()._generate_llm_value({"prompt_template": "Company name"}, {})) == "Acme Corp"
+
+    monkeypatch.setattr(get_provider("openai"), "get_client", lambda: FakeAsyncOpenAI([None, ""]))
+    with pytest.raises(ProviderRequestError):
+        asyncio.run(DataEngine()._generate_llm_value({"prompt_template": "Company name"}, {}))
@@ -0,0 +1,34 @@
+import asyncio
+import random
+import re
+from engine import DataEngine
+from models import GeneratorRequest
+from regex_sampler import compile_regex
+
+def test_sampler_matches_pattern_and_counts_domain():
+    for pattern, domain in [(r"[A-Z]{3}-\d{3}", 26 ** 3 * 1000), (r"^INV-[0-9]{4}$", 10000), (r"(yes|no)", 2), (r"[^a-c]x", 97)]:
+        sampler = compile_regex(pattern)
+        assert sampler.domain_size == domain
+        assert all(re.fullmatch(pattern, sampler.sample()) for _ in range(100))
+
+def test_unique_stream_covers_whole_domain():
+    sampler = compile_regex(r"\d{3}")
+    values = sampler.sample_many(1000, random.Random(7), unique=True)
+    assert sorted(values) == [f"{i:03d}" for i in range(1000)]
+
+def test_unsupported_patterns_fall_back_to_rstr():
+    assert compile_regex(r"(a|b)\1") is None
+    assert compile_regex(r"[unclosed") is None
+    assert DataEngine()._generate_regex_value({"pattern": r"(a|b)\1"}) in ("aa", "bb")
+
+def test_unique_regex_column_fills_small_domain():
+    request = GeneratorRequest(**{
+        "config": {"job_name": "Regex Job"},
+        "tables": [{"id": "t1", "name": "codes", "rows_count": 101, "fields": [
+            {"name": "code", "type": "regex", "params": {"pattern": r"C\d{2}"}, "is_unique": True}
+        ]}]
+    })
+    codes = [row["code"] for row in asyncio.run(DataEngine().generate(request))["codes"]]
+
+    assert sorted(codes[:100]) == [f"C{i:02d}" for i in range(100)]
+    assert codes[100] == "Error: No unique values left for code"
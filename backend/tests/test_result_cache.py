@@ -0,0 +1,121 @@
+import asyncio
+import pytest
+import main
+import result_cache as result_cache_module
+from columnar import ColumnarTable
+from engine import DataEngine
+from job_manager import RedisJobManager
+from models import GeneratorRequest
+from result_cache import RedisResultCache, request_fingerprint
+
+SEEDED_FIELDS = [
+    {"name": "id", "type": "faker", "params": {"method": "uuid4"}},
+    {"name": "age", "type": "integer", "params": {"min": 18, "max": 99}}
+]
+
+class FakeJobManager:
+    def __init__(self): self.jobs = {}
+    def create_job(self, job_id, config, owner=None, result_of=None):
+        self.jobs[job_id] = {"owner": owner, "result_of": result_of}
+
+class FakeResultCache:
+    def __init__(self, cached=None, running=None):
+        self.cached, self.running = cached, running
+    def lookup(self, owner, fingerprint): return self.cached
+    def claim(self, owner, fingerprint, job_id): return self.running
+
+def test_fingerprint_ignores_presentation_and_requires_seed(build_payload):
+    base = request_fingerprint(GeneratorRequest(**build_payload(fields=SEEDED_FIELDS, seed=42)))
+
+    assert base == request_fingerprint(GeneratorRequest(**build_payload(fields=SEEDED_FIELDS, seed=42, job_name="Other", output_format="csv")))
+    assert base != request_fingerprint(GeneratorRequest(**build_payload(fields=SEEDED_FIELDS, seed=7)))
+    assert request_fingerprint(GeneratorRequest(**build_payload(fields=SEEDED_FIELDS))) is None
+
+def test_seeded_generation_is_reproducible(build_payload):
+    request = GeneratorRequest(**build_payload(fields=SEEDED_FIELDS, seed=42))
+    assert asyncio.run(DataEngine().generate(request)) == asyncio.run(DataEngine().generate(request))
+
+def test_async_generation_reuses_results(client, auth_headers, monkeypatch, fake_scheduler, fake_task, build_payload):
+    jobs = FakeJobManager()
+    monkeypatch.setattr(main, "job_manager", jobs)
+
+    monkeypatch.setattr(main, "result_cache", FakeResultCache(cached="finished-job"))
+    response = client.post("/generate/async", json=build_payload(fields=SEEDED_FIELDS, seed=42), headers=auth_headers).json()
+    assert response["status"] == "completed" and response["cached"]
+    assert jobs.jobs[response["job_id"]] == {"owner": "testadmin", "result_of": "finished-job"}
+
+    monkeypatch.setattr(main, "result_cache", FakeResultCache(running="running-job"))
+    response = client.post("/generate/async", json=build_payload(fields=SEEDED_FIELDS, seed=42), headers=auth_headers).json()
+    assert response["status"] == "queued" and jobs.jobs[response["job_id"]]["result_of"] == "running-job"
+    assert fake_task.calls == []
+
+    response = client.post("/generate/async", json=build_payload(fields=SEEDED_FIELDS), headers=auth_headers).json()
+    assert jobs.jobs[response["job_id"]]["result_of"] is None
+    args, _ = fake_task.calls[0]
+    assert args[0] == response["job_id"] and args[2:] == (None, "testadmin", "cpu")
+
+
+@pytest.fixture
+def redis_jobs(monkeypatch, fake_redis):
+    jobs = RedisJobManager()
+    jobs.redis = fake_redis
+    monkeypatch.setattr(result_cache_module, "job_manager", jobs)
+    return jobs
+
+def test_claim_and_release_only_clear_own_claim(redis_jobs):
+    cache = RedisResultCache(redis_jobs.redis, ttl=60)
+
+    assert cache.claim("alice", "fp", "leader") is None
+    assert cache.claim("alice", "fp", "follower") == "leader"
+    assert cache.claim("alice", "fp", "leader") is None and cache.claim("bob", "fp", "other") is None
+
+    cache.release("alice", "fp", "follower")
+    assert cache.claim("alice", "fp", "third") == "leader"
+    cache.release("alice", "fp", "leader")
+    assert cache.claim("alice", "fp", "third") is None
+
+def test_lookup_store_and_eviction(redis_jobs):
+    cache = RedisResultCache(redis_jobs.redis, ttl=60, max_entries=2)
+    for job_id in ("j1", "j2", "j3"):
+        redis_jobs.create_job(job_id, {}, owner="alice")
+        redis_jobs.complete_job(job_id, {"users": ColumnarTable.from_rows([{"id": 1}])})
+    redis_jobs.create_job("running", {}, owner="alice")
+
+    cache.claim("alice", "fp1", "j1")
+    cache.store("alice", "fp1", "j1")
+    assert cache.lookup("alice", "fp1") == "j1" and cache.claim("alice", "fp1", "next") is None
+
+    cache.store("alice", "fp2", "j2")
+    cache.store("alice", "fp3", "j3")
+    assert cache.lookup("alice", "fp1") is None
+    assert [cache.lookup("alice", fp) for fp in ("fp2", "fp3")] == ["j2", "j3"]
+    assert redis_jobs.redis.zrange("result_index:alice", 0, -1) == ["result:alice:fp2", "result:alice:fp3"]
+
+    cache.store("alice", "fp4", "running")
+    assert cache.lookup("alice", "fp4") is None and redis_jobs.redis.get("result:alice:fp4") is None
+
+def test_aliased_job_follows_its_source(redis_jobs):
+    redis_jobs.create_job("leader", {}, owner="alice")
+    redis_jobs.create_job("alias", {}, owner="bob", result_of="leader")
+    assert redis_jobs.get_status("alias") == "pending"
+
+    redis_jobs.complete_job("leader", {"users": ColumnarTable.from_rows([{"id": 1}, {"id": 2}])})
+    alias = redis_jobs.get_job("alias")
+    assert redis_jobs.get_status("alias") == "completed"
+    assert alias["owner"] == "bob" and alias["data"] == redis_jobs.get_job("leader")["data"]
+
+    redis_jobs.redis.delete("job:leader")
+    assert redis_jobs.get_status("alias") == "failed"
+    assert redis_jobs.get_job("alias")["error"] == "Source result expired"
+
+def test_failed_enqueue_releases_claim(client, auth_headers, monkeypatch, redis_jobs, fake_scheduler, fake_task, build_payload):
+    def broker_down(args, **options): raise ConnectionError("broker down")
+    monkeypatch.setattr(fake_task, "apply_async", broker_down)
+    monkeypatch.setattr(main, "job_manager", redis_jobs)
+    monkeypatch.setattr(main, "result_cache", RedisResultCache(redis_jobs.redis, ttl=60))
+
+    with pytest.raises(ConnectionError): client.post("/generate/async", json=build_payload(fields=SEEDED_FIELDS, seed=42), headers=auth_headers)
+
+    [job_key] = [key for key in redis_jobs.redis.hashes if key.startswith("job:")]
+    assert redis_jobs.get_job(job_key[4:])["status"] == "failed"
+    assert not any(key.startswith(("inflight:", "sched:active:")) for key in redis_jobs.redis.values)
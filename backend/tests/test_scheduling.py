@@ -0,0 +1,48 @@
+import main
+from prometheus_client import CollectorRegistry
+from celery_worker import CPU_QUEUE, LLM_QUEUE, PRIORITY_SEP
+from models import GeneratorRequest
+from scheduling import classify_workload, QueueDepthCollector
+
+def value_field(field_type="integer"):
+    params = {"provider": "stub", "prompt_template": "Say hi"} if field_type == "llm" else {"min": 1, "max": 9}
+    return [{"name": "value", "type": field_type, "params": params}]
+
+def test_workload_classification(build_payload):
+    assert classify_workload(GeneratorRequest(**build_payload(fields=value_field("llm")))) == "llm"
+    assert classify_workload(GeneratorRequest(**build_payload(fields=value_field("faker")))) == "cpu"
+
+def test_fair_share_lowers_priority_of_busy_users(fake_scheduler, build_payload):
+    request = GeneratorRequest(**build_payload(rows_count=5000))
+    routes = [fake_scheduler.route(request, "alice") for _ in range(3)]
+
+    assert [r["priority"] for r in routes] == [5, 6, 7] and routes[0]["queue"] == CPU_QUEUE
+    assert fake_scheduler.route(request, "bob")["priority"] == 5
+    assert fake_scheduler.route(GeneratorRequest(**build_payload(rows_count=10)), "bob")["priority"] == 5
+    assert fake_scheduler.route(GeneratorRequest(**build_payload(rows_count=5000, fields=value_field("llm"), priority=0)), "alice") == {"workload": "llm", "queue": LLM_QUEUE, "priority": 0}
+
+    for _ in range(3): fake_scheduler.release("alice", "cpu")
+    assert fake_scheduler.route(request, "alice")["priority"] == 5
+
+def test_async_jobs_are_routed_and_queue_depth_is_collected(client, auth_headers, monkeypatch, fake_scheduler, fake_task, build_payload):
+    monkeypatch.setattr(main.job_manager, "create_job", lambda *args, **kwargs: None)
+
+    response = client.post("/generate/async", json=build_payload(rows_count=5000, fields=value_field("llm"), priority=2), headers=auth_headers).json()
+    assert response["queue"] == LLM_QUEUE and [options for _, options in fake_task.calls] == [{"queue": LLM_QUEUE, "priority": 2}]
+
+    fake_scheduler.redis.lists.update({LLM_QUEUE: [1], f"{LLM_QUEUE}{PRIORITY_SEP}7": [1, 2]})
+    gauge = next(QueueDepthCollector(fake_scheduler).collect())
+    assert {s.labels["queue"]: s.value for s in gauge.samples} == {LLM_QUEUE: 3, CPU_QUEUE: 0}
+
+def test_queue_depth_collector_does_not_scrape_on_register():
+    class UnreachableScheduler:
+        calls = 0
+        def queue_depths(self):
+            self.calls += 1
+            raise ConnectionError("redis down")
+
+    scheduler = UnreachableScheduler()
+    registry = CollectorRegistry()
+    registry.register(QueueDepthCollector(scheduler))
+    assert scheduler.calls == 0
+    assert registry.get_sample_value("datasynth_queue_depth", {"queue": LLM_QUEUE}) is None and scheduler.calls == 1
@@ -0,0 +1,67 @@
+import asyncio
+import io
+import threading
+import zipfile
+import pytest
+import main
+from columnar import ColumnarTable
+from sync_executor import SyncExecutor, AdmissionGate, ExecutorSaturated
+
+class FinishedJobManager:
+    """Job store where every submitted job is already done."""
+    def __init__(self, data): self.data, self.created, self.exports = data, [], []
+    def create_job(self, job_id, config, owner=None, result_of=None): self.created.append(job_id)
+    def get_status(self, job_id): return "completed"
+    def get_job(self, job_id): return {"status": "completed", "data": self.data}
+    def record_export(self, job_id, output_format, seconds): self.exports.append(output_format)
+
+def test_executor_rejects_beyond_capacity():
+    executor = SyncExecutor(workers=1, queue_limit=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.submit(release.wait))
+        queued = asyncio.ensure_future(executor.submit(lambda: "queued"))
+        await asyncio.sleep(0.05)
+        with pytest.raises(ExecutorSaturated): await executor.submit(lambda: "rejected")
+        release.set()
+        return await running, await queued
+
+    assert asyncio.run(scenario()) == (True, "queued")
+    assert executor.admitted == 0
+
+def test_generate_sync_returns_429_when_saturated(client, auth_headers, monkeypatch, build_payload):
+    executor = SyncExecutor(workers=1, queue_limit=0)
+    executor.admitted = executor.capacity
+    monkeypatch.setattr(main, "sync_executor", executor)
+
+    response = client.post("/generate", json=build_payload(), headers=auth_headers)
+    assert response.status_code == 429
+    assert response.headers["Retry-After"]
+
+@pytest.mark.parametrize("output_format", ["json", "csv"])
+def test_large_sync_request_is_streamed_from_worker(client, auth_headers, monkeypatch, fake_scheduler, fake_task, build_payload, output_format):
+    rows = [{"age": 20 + i} for i in range(50)]
+    jobs = FinishedJobManager({"users": ColumnarTable.from_rows(rows)})
+    monkeypatch.setattr(main, "job_manager", jobs)
+    monkeypatch.setattr(main, "SYNC_MAX_ROWS", 10)
+
+    response = client.post("/generate", json=build_payload(rows_count=50, output_format=output_format), headers=auth_headers)
+    assert response.status_code == 200
+    assert response.headers["X-Job-Id"] == jobs.created[0] == fake_task.calls[0][0][0]
+    if output_format == "json":
+        assert response.json() == {"status": "success", "job_name": "Test Job", "tables_count": 1, "total_rows": 50, "data": {"users": rows}}
+    else:
+        with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+            assert archive.read("users.csv").decode().splitlines()[1] == "20"
+        assert jobs.exports == ["csv"]
+
+def test_offloaded_requests_are_admission_controlled(client, auth_headers, monkeypatch, fake_scheduler, fake_task, build_payload):
+    gate = AdmissionGate(1)
+    monkeypatch.setattr(main, "offload_gate", gate)
+    monkeypatch.setattr(main, "SYNC_MAX_ROWS", 10)
+
+    with gate.slot():
+        response = client.post("/generate", json=build_payload(rows_count=50), headers=auth_headers)
+    assert response.status_code == 429 and response.headers["Retry-After"]
+    assert fake_task.calls == [] and gate.admitted == 0
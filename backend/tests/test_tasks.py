@@ -0,0 +1,68 @@
+import pytest
+from celery.exceptions import Retry
+import tasks
+from job_manager import RedisJobManager, LeaseLostError
+from models import GeneratorRequest
+from result_cache import RedisResultCache
+
+@pytest.fixture
+def redis_jobs(monkeypatch, fake_redis):
+    jobs = RedisJobManager()
+    jobs.redis = fake_redis
+    monkeypatch.setattr(tasks, "job_manager", jobs)
+    monkeypatch.setattr("engine.job_manager", jobs)
+    return jobs
+
+def chunk(values): return {"columns": ["id"], "data": {"id": values}, "length": len(values)}
+
+def test_checkpoints_require_the_lease(redis_jobs):
+    assert redis_jobs.acquire_lease("job-1", "run-a")
+    assert not redis_jobs.acquire_lease("job-1", "run-b")
+
+    redis_jobs.save_checkpoint("job-1", "t1", chunk([1, 2]), {"rows_done": 2}, lease="run-a")
+    with pytest.raises(LeaseLostError): redis_jobs.save_checkpoint("job-1", "t1", chunk([3]), {"rows_done": 3}, lease="run-b")
+    assert redis_jobs.redis.lists["job:job-1:rows:t1"] == [redis_jobs.redis.lists["job:job-1:rows:t1"][0]]
+    assert redis_jobs.load_checkpoint("job-1")["state"] == {"rows_done": 2}
+
+    redis_jobs.release_lease("job-1", "run-b")
+    assert not redis_jobs.acquire_lease("job-1", "run-b")
+    redis_jobs.release_lease("job-1", "run-a")
+    assert redis_jobs.acquire_lease("job-1", "run-b")
+
+def test_task_waits_while_another_run_holds_the_lease(redis_jobs, build_payload):
+    request = GeneratorRequest(**build_payload())
+    redis_jobs.create_job("job-1", request.model_dump())
+    redis_jobs.acquire_lease("job-1", "other-worker")
+
+    with pytest.raises(Retry): tasks.generate_dataset_task.run("job-1", request.model_dump_json())
+    assert redis_jobs.get_status("job-1") == "pending" and redis_jobs.redis.get("job:job-1:lease") == "other-worker"
+
+def test_task_gives_up_after_max_runs(redis_jobs, build_payload, monkeypatch):
+    request = GeneratorRequest(**build_payload())
+    redis_jobs.create_job("job-1", request.model_dump())
+    monkeypatch.setattr(tasks, "JOB_MAX_RUNS", 1)
+    assert tasks.generate_dataset_task.run("job-1", request.model_dump_json())["status"] == "success"
+
+    # Pretend the result was never stored, e.g. the worker was OOM-killed mid-job and the task redelivered.
+    redis_jobs.redis.hashes["job:job-1"]["status"] = "running"
+    redis_jobs.save_checkpoint("job-1", "t1", chunk([1]), {"rows_done": 1})
+    with pytest.raises(RuntimeError): tasks.generate_dataset_task.run("job-1", request.model_dump_json())
+
+    assert redis_jobs.get_job("job-1")["error"] == "Job gave up after 1 runs"
+    assert redis_jobs.load_checkpoint("job-1") is None and redis_jobs.redis.get("job:job-1:lease") is None
+
+def test_redelivered_completed_job_finishes_bookkeeping(redis_jobs, fake_scheduler, build_payload, monkeypatch):
+    cache = RedisResultCache(redis_jobs.redis, ttl=60)
+    monkeypatch.setattr(tasks, "result_cache", cache)
+    monkeypatch.setattr("result_cache.job_manager", redis_jobs)
+    monkeypatch.setattr(tasks, "scheduler", fake_scheduler)
+    request = GeneratorRequest(**build_payload(seed=1))
+    for _ in range(2): fake_scheduler.route(request, "alice")
+    redis_jobs.create_job("job-1", request.model_dump(), owner="alice")
+    cache.claim("alice", "fp", "job-1")
+    redis_jobs.complete_job("job-1", {})
+
+    for _ in range(2): tasks.generate_dataset_task.run("job-1", request.model_dump_json(), "fp", "alice", "cpu")
+
+    assert cache.lookup("alice", "fp") == "job-1" and redis_jobs.redis.get("inflight:alice:fp") is None
+    assert redis_jobs.redis.values["sched:active:cpu:alice"] == 1